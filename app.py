@@ -9,7 +9,12 @@ from pdf_tools.filecompress import compress_bp
 from pdf_tools.merge import merge_bp
 from pdf_tools.split import split_bp
 from pdf_tools.watermark import watermark_bp
+from pdf_tools.thumbnail import init_thumbnails, thumbnail_bp
 from otherTools.aiagentCode import project_bp
+from middleware.compression import init_compression
+from middleware.metrics import init_metrics
+from middleware.profiling import init_profiling
+from pdf_tools.artifacts import init_artifact_store
 
 load_dotenv()
 
@@ -31,10 +36,29 @@ def create_app():
     app.register_blueprint(merge_bp)
     app.register_blueprint(split_bp)
     app.register_blueprint(watermark_bp)
+    app.register_blueprint(thumbnail_bp)
     app.register_blueprint(doc_bp)
     app.register_blueprint(project_bp)
 
+    # Metrik Prometheus di /metrics; didaftarkan sebelum kompresi agar byte
+    # respons yang dihitung adalah byte setelah kompresi
+    init_metrics(app)
+
+    # Kompresi respons (brotli/gzip) untuk payload JSON dan HTML yang besar
+    init_compression(app)
+
+    # Profiling opt-in per request (PROFILE_TOKEN / PROFILE_SAMPLE_RATE); didaftarkan
+    # terakhir agar membaca body JSON sebelum dikompresi
+    init_profiling(app)
+
     # Buat folder upload di /tmp
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+    # Penyimpanan artefak PDF: file kecil di memori (ARTIFACT_MEMORY_MB), sisanya
+    # di-spill ke UPLOAD_FOLDER/<batch_id>
+    init_artifact_store(app)
+
+    # Thumbnail halaman PDF; process pool baru dibuat saat thumbnail pertama diminta
+    init_thumbnails(app)
+
     return app
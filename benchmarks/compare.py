@@ -0,0 +1,44 @@
+"""Compare two benchmark reports produced by `benchmarks/run.py`.
+
+Usage:
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+
+
+def load_results(path):
+    with open(path) as report:
+        data = json.load(report)
+    return data['meta'], {(row['scenario'], row['concurrency']): row for row in data['results']}
+
+
+def change(before, after):
+    if not before or after is None:
+        return '   n/a'
+    return f'{(after - before) / before * 100:+6.1f}%'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    args = parser.parse_args(argv)
+
+    before_meta, before = load_results(args.before)
+    after_meta, after = load_results(args.after)
+    print(f"before: {before_meta.get('git_revision')}  after: {after_meta.get('git_revision')}")
+    print(f"{'scenario':<10} {'c':>3} {'rps':>16} {'p50':>8} {'p95':>8} {'p99':>8} {'rss':>8} {'errors':>9}")
+    for key in sorted(set(before) & set(after)):
+        old, new = before[key], after[key]
+        print(f"{key[0]:<10} {key[1]:>3} "
+              f"{new['throughput_rps']:>8} {change(old['throughput_rps'], new['throughput_rps'])} "
+              f"{change(old['latency_ms']['p50'], new['latency_ms']['p50'])} "
+              f"{change(old['latency_ms']['p95'], new['latency_ms']['p95'])} "
+              f"{change(old['latency_ms']['p99'], new['latency_ms']['p99'])} "
+              f"{change(old['peak_rss_mb'], new['peak_rss_mb'])} "
+              f"{old['errors']:>4}->{new['errors']:<4}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Synthetic PDF corpus for the benchmark suite.
+
+Documents are written by hand as minimal, valid PDF 1.4 files so the suite
+needs no extra dependencies. Every page carries a text content stream, and the
+first page is padded with an extra stream so the file reaches its target size.
+"""
+import random
+
+# (label, page count, approximate size in bytes)
+DEFAULT_CORPUS = [
+    ('small_1p', 1, 20 * 1024),
+    ('medium_10p', 10, 300 * 1024),
+    ('large_50p', 50, 2 * 1024 * 1024),
+]
+
+
+def make_pdf(page_count, target_size=0):
+    """Return the bytes of a PDF with `page_count` pages of roughly `target_size` bytes."""
+    page_count = max(1, page_count)
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    pages = add(None)
+    font = add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+
+    page_ids = []
+    for number in range(1, page_count + 1):
+        text = f'BT /F1 24 Tf 72 720 Td (Benchmark page {number}) Tj ET'.encode('ascii')
+        content = add(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(text), text))
+        page_ids.append(add(
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] '
+            b'/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>' % (pages, font, content)
+        ))
+
+    # Deterministic, incompressible padding so runs are comparable between versions
+    overhead = 300 + 260 * page_count
+    padding_size = max(0, target_size - overhead)
+    if padding_size:
+        padding = random.Random(padding_size).randbytes(padding_size)
+        add(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(padding), padding))
+
+    kids = b' '.join(b'%d 0 R' % page_id for page_id in page_ids)
+    objects[catalog - 1] = b'<< /Type /Catalog /Pages %d 0 R >>' % pages
+    objects[pages - 1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, page_count)
+
+    out = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        out += b'%010d 00000 n \n' % offset
+    out += b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+        len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+
+def build_corpus(spec=None):
+    """Build the corpus as a list of dicts with label, pages, size and data."""
+    corpus = []
+    for label, page_count, size in spec or DEFAULT_CORPUS:
+        data = make_pdf(page_count, size)
+        corpus.append({'label': label, 'pages': page_count, 'size': len(data), 'data': data})
+    return corpus
+
+
+def parse_corpus_spec(value):
+    """Parse 'label:pages:kb,...' from the command line."""
+    spec = []
+    for item in value.split(','):
+        label, page_count, size_kb = item.split(':')
+        spec.append((label, int(page_count), int(size_kb) * 1024))
+    return spec
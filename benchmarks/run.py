@@ -0,0 +1,340 @@
+"""Offline throughput/latency benchmark for the PDF tools and the AI agent.
+
+Runs `create_app()` behind a local threaded WSGI server. iLovePDF is served by
+`ILovePdfStub` and Gemini is replaced by `FakeGeminiModel`. Each scenario is
+driven at increasing concurrency with the synthetic corpus, and the results
+are written as JSON. Compare two runs with `benchmarks/compare.py`.
+
+Usage:
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --scenarios compress,split --concurrency 1,8,32 \\
+        --ilovepdf-latency 0.2 --ilovepdf-failure-rate 0.02 --requests 100
+"""
+import argparse
+import contextlib
+import json
+import logging
+import math
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.corpus import DEFAULT_CORPUS, build_corpus, parse_corpus_spec
+from benchmarks.stubs import FakeGeminiModel, ILovePdfStub, StubBehaviour, route_ilovepdf_to
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PDF_API = '/api/pdf-tools'
+AI_API = '/api/ai-agentweb'
+
+
+def pdf_upload(doc, name=None):
+    return (name or f"{doc['label']}.pdf", doc['data'], 'application/pdf')
+
+
+def run_compress(session, base_url, corpus, index):
+    doc = corpus[index % len(corpus)]
+    response = session.post(f'{base_url}{PDF_API}/compress',
+                            files=[('files', pdf_upload(doc))],
+                            data={'compression_level': 'medium'})
+    return response.status_code == 200, len(doc['data']), len(response.content)
+
+
+def run_merge(session, base_url, corpus, index):
+    first = corpus[index % len(corpus)]
+    second = corpus[(index + 1) % len(corpus)]
+    response = session.post(f'{base_url}{PDF_API}/merge',
+                            files=[('files', pdf_upload(first, 'a.pdf')),
+                                   ('files', pdf_upload(second, 'b.pdf'))])
+    return response.status_code == 200, len(first['data']) + len(second['data']), len(response.content)
+
+
+def run_split(session, base_url, corpus, index):
+    doc = corpus[index % len(corpus)]
+    response = session.post(f'{base_url}{PDF_API}/split',
+                            files={'file': pdf_upload(doc)},
+                            data={'mode': 'ranges', 'pages': f"1-{max(1, doc['pages'] // 2)}"})
+    return response.status_code == 200, len(doc['data']), len(response.content)
+
+
+def run_watermark(session, base_url, corpus, index):
+    doc = corpus[index % len(corpus)]
+    response = session.post(f'{base_url}{PDF_API}/watermark',
+                            files={'file': pdf_upload(doc)},
+                            data={'watermark_text': 'CONFIDENTIAL', 'opacity': '40'})
+    return response.status_code == 200, len(doc['data']), len(response.content)
+
+
+def run_thumbnail(session, base_url, corpus, index):
+    """Upload for preview, then fetch the first three page thumbnails (cold, then cached)."""
+    doc = corpus[index % len(corpus)]
+    response = session.post(f'{base_url}{PDF_API}/preview', files={'file': pdf_upload(doc)})
+    if response.status_code != 200:
+        return False, len(doc['data']), len(response.content)
+    preview = response.json()
+    received = len(response.content)
+    ok = True
+    for page in range(1, min(3, preview['page_count']) + 1):
+        response = session.get(f"{base_url}{PDF_API}/thumbnail/{preview['batch_id']}/{preview['filename']}/{page}")
+        ok = ok and response.status_code == 200
+        received += len(response.content)
+    return ok, len(doc['data']), received
+
+
+def run_ai_create(session, base_url, corpus, index, timeout=120):
+    """Create a project and long-poll its status until generation finishes."""
+    response = session.post(f'{base_url}{AI_API}/create', json={'prompt': f'Toko online #{index}'})
+    if response.status_code != 200:
+        return False, 0, len(response.content)
+    project_id = response.json()['project_id']
+    received = len(response.content)
+
+    deadline = time.monotonic() + timeout
+    status = 'processing'
+    while status == 'processing' and time.monotonic() < deadline:
+        response = session.get(f'{base_url}{AI_API}/project/{project_id}/status', params={'wait': 20})
+        received += len(response.content)
+        status = response.json().get('status')
+    return status == 'completed', 0, received
+
+
+SCENARIOS = {
+    'compress': run_compress,
+    'merge': run_merge,
+    'split': run_split,
+    'watermark': run_watermark,
+    'thumbnail': run_thumbnail,
+    'ai-create': run_ai_create,
+}
+
+
+def read_rss_bytes():
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def directory_size(path):
+    total = 0
+    for folder, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(folder, name))
+            except OSError:
+                pass
+    return total
+
+
+class ResourceSampler:
+    """Background sampler for peak RSS and peak size of the upload folder."""
+
+    def __init__(self, upload_folder, interval=0.05):
+        self.upload_folder = upload_folder
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_tmp = 0
+        self.start_tmp = directory_size(upload_folder)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        self.peak_rss = max(self.peak_rss, read_rss_bytes())
+        self.peak_tmp = max(self.peak_tmp, directory_size(self.upload_folder))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        return {
+            'peak_rss_mb': round(self.peak_rss / (1024 * 1024), 2),
+            'peak_tmp_bytes': self.peak_tmp,
+            'tmp_growth_bytes': directory_size(self.upload_folder) - self.start_tmp,
+        }
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_level(scenario, base_url, corpus, concurrency, total_requests, upload_folder):
+    runner = SCENARIOS[scenario]
+    local = threading.local()
+
+    def one(index):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            ok, sent, received = runner(local.session, base_url, corpus, index)
+        except requests.RequestException:
+            ok, sent, received = False, 0, 0
+        return ok, time.perf_counter() - started, sent, received
+
+    sampler = ResourceSampler(upload_folder).start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(total_requests)))
+    elapsed = time.perf_counter() - started
+    resources = sampler.stop()
+
+    latencies = sorted(duration * 1000 for ok, duration, _, _ in outcomes if ok)
+    errors = sum(1 for ok, _, _, _ in outcomes if not ok)
+    return {
+        'scenario': scenario,
+        'concurrency': concurrency,
+        'requests': total_requests,
+        'errors': errors,
+        'error_rate': round(errors / total_requests, 4),
+        'duration_s': round(elapsed, 3),
+        'throughput_rps': round((total_requests - errors) / elapsed, 3) if elapsed else None,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50), 2) if latencies else None,
+            'p95': round(percentile(latencies, 0.95), 2) if latencies else None,
+            'p99': round(percentile(latencies, 0.99), 2) if latencies else None,
+            'mean': round(sum(latencies) / len(latencies), 2) if latencies else None,
+            'max': round(latencies[-1], 2) if latencies else None,
+        },
+        'bytes_sent': sum(sent for _, _, sent, _ in outcomes),
+        'bytes_received': sum(received for _, _, _, received in outcomes),
+        **resources,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_app_server(upload_folder, log_level):
+    from werkzeug.serving import make_server
+
+    os.environ['UPLOAD_FOLDER'] = upload_folder
+    os.environ.setdefault('ILOVEPDF_PUBLIC_KEY', 'benchmark-public-key')
+    from app import create_app
+
+    app = create_app()
+    # The blueprints call logging.basicConfig(level=INFO) on import
+    logging.getLogger().setLevel(log_level)
+    logging.getLogger('werkzeug').setLevel(max(logging.ERROR, logging.getLevelName(log_level)))
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help='comma separated subset of: ' + ', '.join(SCENARIOS))
+    parser.add_argument('--concurrency', default='1,4,16', help='comma separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=32, help='requests per scenario and level')
+    parser.add_argument('--corpus', type=parse_corpus_spec, default=None,
+                        help="'label:pages:kb,...' (default: %s)" % ','.join(
+                            f'{label}:{pages}:{size // 1024}' for label, pages, size in DEFAULT_CORPUS))
+    parser.add_argument('--ilovepdf-latency', type=float, default=0.05, help='seconds per stub call')
+    parser.add_argument('--ilovepdf-jitter', type=float, default=0.0)
+    parser.add_argument('--ilovepdf-failure-rate', type=float, default=0.0)
+    parser.add_argument('--gemini-latency', type=float, default=0.5, help='seconds per generate_content')
+    parser.add_argument('--gemini-jitter', type=float, default=0.0)
+    parser.add_argument('--gemini-failure-rate', type=float, default=0.0)
+    parser.add_argument('--log-level', default='CRITICAL',
+                        help='application log level while benchmarking (injected failures log tracebacks)')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    corpus = build_corpus(args.corpus)
+    upload_folder = tempfile.mkdtemp(prefix='bench-uploads-')
+    stub = ILovePdfStub(StubBehaviour(args.ilovepdf_latency, args.ilovepdf_jitter,
+                                      args.ilovepdf_failure_rate)).start()
+    undo_routing = route_ilovepdf_to(stub)
+    fake_model = FakeGeminiModel(StubBehaviour(args.gemini_latency, args.gemini_jitter,
+                                               args.gemini_failure_rate))
+
+    results = []
+    server = None
+    try:
+        # pylovepdf and the app print progress to stdout; keep it for the report
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            server, base_url = start_app_server(upload_folder, args.log_level.upper())
+            from otherTools import aiagentCode
+            from otherTools.modelchain import create_model_chain
+            aiagentCode.model_chain = create_model_chain(factory=lambda name: fake_model)
+
+            for scenario in scenarios:
+                for level in levels:
+                    result = run_level(scenario, base_url, corpus, level, args.requests, upload_folder)
+                    results.append(result)
+                    print(f"{scenario:<10} c={level:<3} {result['throughput_rps']:>8} rps  "
+                          f"p50={result['latency_ms']['p50']}ms p95={result['latency_ms']['p95']}ms "
+                          f"p99={result['latency_ms']['p99']}ms errors={result['errors']} "
+                          f"rss={result['peak_rss_mb']}MB tmp={result['peak_tmp_bytes']}B",
+                          file=sys.stderr)
+    finally:
+        if server is not None:
+            server.shutdown()
+        undo_routing()
+        stub.stop()
+        shutil.rmtree(upload_folder, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': int(time.time()),
+            'config': {key: value for key, value in vars(args).items() if key not in ('output', 'corpus')},
+            'corpus': [{key: doc[key] for key in ('label', 'pages', 'size')} for doc in corpus],
+            'stub_calls': stub.calls,
+        },
+        'results': results,
+    }
+    data = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(data + '\n')
+    else:
+        print(data)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""Local stand-ins for iLovePDF and Gemini used by the benchmark suite.
+
+`ILovePdfStub` is a threaded HTTP server that implements the parts of the
+iLovePDF REST lifecycle pylovepdf uses: auth, start, upload, process and
+download. `route_ilovepdf_to` points pylovepdf at it. `FakeGeminiModel`
+stands in for `GenerativeModel.generate_content`. Both take a latency and a
+failure rate.
+"""
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from benchmarks.corpus import make_pdf
+
+# Output size relative to the uploaded input, per tool
+OUTPUT_RATIO = {'compress': 0.6, 'merge': 1.0, 'split': 0.5, 'watermark': 1.02}
+
+
+class StubBehaviour:
+    """Latency (seconds, +/- jitter) and failure rate shared by the stubs."""
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=1):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        with self._lock:
+            offset = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        if self.latency + offset > 0:
+            time.sleep(self.latency + offset)
+
+    def should_fail(self):
+        with self._lock:
+            return self.failure_rate > 0 and self._random.random() < self.failure_rate
+
+
+def parse_multipart(content_type, body):
+    """Minimal multipart/form-data split: returns (text fields, bytes of the 'file' part).
+
+    Much cheaper than the email package on multi-megabyte uploads, so the stub
+    does not dominate the timings it is meant to stay out of.
+    """
+    boundary = content_type.split('boundary=', 1)[1].strip('"').encode('latin-1')
+    fields, data = {}, b''
+    for part in body.split(b'--' + boundary)[1:-1]:
+        head, _, content = part.partition(b'\r\n\r\n')
+        content = content[:-2] if content.endswith(b'\r\n') else content
+        name = head.split(b'name="', 1)[1].split(b'"', 1)[0].decode('latin-1')
+        if name == 'file':
+            data = content
+        else:
+            fields[name] = content.decode('utf-8').strip()
+    return fields, data
+
+
+class ILovePdfStub:
+    """Threaded local server that mimics the iLovePDF task lifecycle."""
+
+    def __init__(self, behaviour=None, host='127.0.0.1', port=0):
+        self.behaviour = behaviour or StubBehaviour()
+        self.tasks = {}
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f'{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, stage):
+        with self.lock:
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return self.rfile.read(length) if length else b''
+
+            def _json(self, status, payload):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _fail(self, stage):
+                stub._count(f'{stage}_failed')
+                self._json(500, {'error': {'type': 'ServerError', 'message': f'Stub {stage} failure'}})
+
+            def do_GET(self):
+                body = self._body()
+                parts = self.path.strip('/').split('/')
+                stub.behaviour.delay()
+                if parts[:2] == ['v1', 'start'] and len(parts) == 3:
+                    stub._count('start')
+                    task_id = uuid.uuid4().hex
+                    with stub.lock:
+                        stub.tasks[task_id] = {'tool': parts[2], 'files': {}, 'processed': False}
+                    return self._json(200, {'server': stub.address, 'task': task_id})
+                if parts[:2] == ['v1', 'download'] and len(parts) == 3:
+                    return self._download(parts[2])
+                if parts[:2] == ['v1', 'task'] and len(parts) == 3:
+                    task = stub.tasks.get(parts[2])
+                    status = 'TaskSuccess' if task and task['processed'] else 'TaskWaiting'
+                    return self._json(200, {'status': status})
+                self._json(404, {'error': {'message': f'Unknown endpoint {self.path}', 'body': len(body)}})
+
+            def do_POST(self):
+                body = self._body()
+                parts = self.path.strip('/').split('/')
+                stub.behaviour.delay()
+                if parts == ['v1', 'auth']:
+                    stub._count('auth')
+                    return self._json(200, {'token': 'stub-token'})
+                if parts == ['v1', 'upload']:
+                    return self._upload(body)
+                if parts == ['v1', 'process']:
+                    return self._process(body)
+                self._json(404, {'error': {'message': f'Unknown endpoint {self.path}'}})
+
+            def _upload(self, body):
+                if stub.behaviour.should_fail():
+                    return self._fail('upload')
+                fields, data = parse_multipart(self.headers['Content-Type'], body)
+
+                task = stub.tasks.get(fields.get('task'))
+                if task is None:
+                    return self._json(400, {'error': {'message': 'Unknown task'}})
+                server_filename = uuid.uuid4().hex + '.pdf'
+                with stub.lock:
+                    task['files'][server_filename] = len(data)
+                stub._count('upload')
+                self._json(200, {'server_filename': server_filename})
+
+            def _process(self, body):
+                if stub.behaviour.should_fail():
+                    return self._fail('process')
+                form = {key: values[0] for key, values in parse_qs(body.decode('utf-8')).items()}
+                task = stub.tasks.get(form.get('task'))
+                if task is None:
+                    return self._json(400, {'error': {'message': 'Unknown task'}})
+                task['processed'] = True
+                stub._count('process')
+                input_size = sum(task['files'].values())
+                self._json(200, {
+                    'status': 'TaskSuccess',
+                    'download_filename': f"{task['tool']}-output.pdf",
+                    'filesize': input_size,
+                    'output_filesize': int(input_size * OUTPUT_RATIO.get(task['tool'], 1.0))
+                })
+
+            def _download(self, task_id):
+                task = stub.tasks.get(task_id)
+                if task is None or not task['processed']:
+                    return self._json(404, {'error': {'message': 'Task not processed'}})
+                if stub.behaviour.should_fail():
+                    return self._fail('download')
+                input_size = sum(task['files'].values())
+                data = make_pdf(1, int(input_size * OUTPUT_RATIO.get(task['tool'], 1.0)))
+                stub._count('download')
+                with stub.lock:
+                    stub.tasks.pop(task_id, None)
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/pdf')
+                # pylovepdf strips everything before the first underscore
+                self.send_header('Content-Disposition', f'attachment; filename="stub_{task["tool"]}-output.pdf"')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def route_ilovepdf_to(stub):
+    """Send every pylovepdf request to `stub` over plain HTTP. Returns an undo function."""
+    from pylovepdf import request as pylovepdf_request
+
+    original_send = pylovepdf_request.Request.send
+
+    def send(method, url, payload, headers=None, files=None, stream=None, verify_ssl=True, proxies=None):
+        url = url.replace('https://api.ilovepdf.com', f'http://{stub.address}', 1)
+        url = url.replace('https://', 'http://', 1)
+        return original_send(method, url, payload, headers, files, stream, verify_ssl, proxies)
+
+    pylovepdf_request.Request.send = staticmethod(send)
+    return lambda: setattr(pylovepdf_request.Request, 'send', staticmethod(original_send))
+
+
+class FakeGeminiResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """In-process stand-in for `genai.GenerativeModel` with a structured response."""
+
+    def __init__(self, behaviour=None, pages=('index', 'about', 'services', 'contact'), page_kb=8):
+        self.behaviour = behaviour or StubBehaviour()
+        self.pages = pages
+        self.page_kb = page_kb
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        with self._lock:
+            self.calls += 1
+        self.behaviour.delay()
+        if self.behaviour.should_fail():
+            raise RuntimeError('Fake Gemini failure')
+        return FakeGeminiResponse(self.render(prompt))
+
+    def render(self, prompt):
+        filler = '<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>\n'
+        body = filler * max(1, (self.page_kb * 1024) // len(filler))
+        sections = [
+            '### JUDUL APLIKASI ###\nBenchmark App\n',
+            f'### DESKRIPSI ###\nGenerated for: {prompt[:80]}\n',
+        ]
+        for name in self.pages:
+            sections.append(
+                f'### PAGE: {name} ###\n<html><head><style>.{name} {{ color: #333; }}</style></head>'
+                f'<body><section class="{name}"><h2>{name.title()}</h2>\n{body}</section>'
+                f'<script>console.log("{name}");</script></body></html>\n'
+            )
+        sections.append('### BACKEND (PYTHON FLASK) ###\nfrom flask import Flask\napp = Flask(__name__)\n###\n')
+        sections.append('### INSTRUKSI DEPLOY ###\n1. Simpan setiap halaman HTML.\n')
+        return '\n'.join(sections)
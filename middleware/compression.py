@@ -0,0 +1,102 @@
+import gzip
+import threading
+from collections import OrderedDict
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli opsional, gzip selalu tersedia
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/javascript',
+    'image/svg+xml'
+}
+
+
+class CompressedBodyCache:
+    """LRU kecil untuk body terkompresi dari respons immutable, dibatasi ukuran byte."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._items.get(key)
+            if body is not None:
+                self._items.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+
+def compress_body(data, encoding, cacheable=False):
+    # Body yang akan di-cache layak dikompresi lebih keras karena hanya sekali
+    if encoding == 'br':
+        return brotli.compress(data, quality=9 if cacheable else 4)
+    return gzip.compress(data, compresslevel=9 if cacheable else 6)
+
+
+def negotiate_encoding():
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+
+def init_compression(app):
+    """Mendaftarkan kompresi respons (brotli/gzip) pada aplikasi Flask."""
+    app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+    app.config.setdefault('COMPRESS_CACHE_MB', 32)
+    cache = CompressedBodyCache(app.config['COMPRESS_CACHE_MB'] * 1024 * 1024)
+    app.extensions['compression_cache'] = cache
+
+    @app.after_request
+    def compress_response(response):
+        if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+            return response
+        if 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding()
+        if not encoding:
+            return response
+
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+
+        etag, _ = response.get_etag()
+        cacheable = bool(etag) and 'immutable' in response.headers.get('Cache-Control', '')
+        key = (request.path, etag, encoding)
+
+        body = cache.get(key) if cacheable else None
+        if body is None:
+            body = compress_body(data, encoding, cacheable)
+            if cacheable:
+                cache.put(key, body)
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            # Representasi terkompresi berbeda byte-nya; If-None-Match tetap cocok secara weak
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,263 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import Response, g, request
+
+# Bucket latensi (detik) untuk request HTTP dan tahapan pipeline PDF/AI
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labelnames, values, extra=''):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """Metrik dengan label; setiap kombinasi label disimpan sebagai child."""
+
+    type = ''
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self):
+        """Menghasilkan (suffix, label_values, extra_label, value) untuk eksposisi."""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for suffix, values, extra, value in self.samples():
+            lines.append(f'{self.name}{suffix}{format_labels(self.labelnames, values, extra)} {value}')
+        return lines
+
+
+class ValueChild:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def _new_child(self):
+        return ValueChild()
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            yield '', values, '', child.value
+
+
+class Gauge(Metric):
+    """Gauge biasa, atau gauge yang dihitung saat scrape bila `callback` diberikan.
+
+    Callback mengembalikan angka (tanpa label) atau dict {tuple label: angka}.
+    """
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def _new_child(self):
+        return ValueChild()
+
+    def samples(self):
+        if self.callback is None:
+            for values, child in list(self._children.items()):
+                yield '', values, '', child.value
+            return
+        try:
+            result = self.callback()
+        except Exception:
+            return
+        if isinstance(result, dict):
+            for values, value in result.items():
+                yield '', values, '', value
+        else:
+            yield '', (), '', result
+
+
+class HistogramChild:
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return HistogramChild(self.buckets)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield '_bucket', values, f'le="{bound}"', cumulative
+            yield '_bucket', values, 'le="+Inf"', count
+            yield '_sum', values, '', total
+            yield '_count', values, '', count
+
+
+class Registry:
+    """Kumpulan metrik per proses. Dengan beberapa worker gunicorn, setiap worker
+    mengekspos angkanya sendiri (bedakan lewat label instance di Prometheus)."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        return self._get_or_create(Gauge, name, documentation, labelnames, callback=callback)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Durasi request HTTP.', ('endpoint',))
+REQUESTS_TOTAL = REGISTRY.counter(
+    'http_requests_total', 'Jumlah request HTTP.', ('endpoint', 'status'))
+REQUEST_BYTES = REGISTRY.counter(
+    'http_request_bytes_total', 'Byte body request yang diterima.', ('endpoint',))
+RESPONSE_BYTES = REGISTRY.counter(
+    'http_response_bytes_total', 'Byte body respons yang dikirim (setelah kompresi).', ('endpoint',))
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    'http_requests_in_flight', 'Request HTTP yang sedang diproses.', ('endpoint',))
+STAGE_SECONDS = REGISTRY.histogram(
+    'pipeline_stage_duration_seconds', 'Durasi tiap tahapan pipeline PDF dan AI.', ('endpoint', 'stage'))
+STAGE_BYTES = REGISTRY.counter(
+    'pipeline_stage_bytes_total', 'Byte yang diproses per tahapan pipeline.', ('endpoint', 'stage'))
+WORK_IN_FLIGHT = REGISTRY.gauge(
+    'pipeline_work_in_flight', 'Pekerjaan latar belakang yang sedang berjalan.', ('endpoint',))
+
+
+@contextmanager
+def stage_timer(endpoint, stage):
+    """Mencatat durasi satu tahapan ke histogram pipeline_stage_duration_seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(endpoint, stage).observe(time.perf_counter() - start)
+
+
+def observe_stage(endpoint, stage, seconds):
+    STAGE_SECONDS.labels(endpoint, stage).observe(seconds)
+
+
+def count_bytes(endpoint, stage, size):
+    STAGE_BYTES.labels(endpoint, stage).inc(size)
+
+
+def init_metrics(app):
+    """Mendaftarkan hook metrik request dan endpoint /metrics.
+
+    Panggil sebelum init_compression agar byte respons dihitung setelah kompresi
+    (after_request dijalankan dalam urutan terbalik).
+    """
+
+    @app.before_request
+    def start_request_metrics():
+        endpoint = request.endpoint or 'unmatched'
+        g.metrics_endpoint = endpoint
+        g.metrics_start = time.perf_counter()
+        REQUESTS_IN_FLIGHT.labels(endpoint).inc()
+        if request.content_length:
+            REQUEST_BYTES.labels(endpoint).inc(request.content_length)
+
+    @app.after_request
+    def record_response_metrics(response):
+        endpoint = g.get('metrics_endpoint')
+        if endpoint is None:
+            return response
+        REQUESTS_TOTAL.labels(endpoint, str(response.status_code)).inc()
+        if response.content_length:
+            RESPONSE_BYTES.labels(endpoint).inc(response.content_length)
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        endpoint = g.pop('metrics_endpoint', None)
+        if endpoint is None:
+            return
+        REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - g.pop('metrics_start'))
+        REQUESTS_IN_FLIGHT.labels(endpoint).dec()
+
+    def metrics():
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics)
@@ -0,0 +1,249 @@
+import cProfile
+import hmac
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from flask import g, has_app_context, request
+from werkzeug.utils import secure_filename
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_MODES = ('collapsed', 'pstats')
+# Batas panjang kunci di nama file profil
+PROFILE_KEY_MAX_LENGTH = 64
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame):
+    """Stack dari root ke frame saat ini dalam format collapsed (dipisah ';')."""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class ProfileSession:
+    """Satu sesi profiling untuk sebuah request beserta thread latar yang dimulainya.
+
+    Mode 'collapsed' mengambil sampel stack wall-clock dari semua thread yang
+    terdaftar setiap `interval` detik (kompatibel dengan flamegraph.pl/speedscope).
+    Mode 'pstats' memakai cProfile per thread lalu menggabungkannya.
+    Output ditulis setelah request dan semua thread terdaftar selesai; file
+    terlama dihapus agar PROFILE_DIR tidak melebihi `max_files` / `max_age`.
+    """
+
+    def __init__(self, mode, output_dir, interval=0.005, max_files=100, max_age=86400):
+        self.mode = mode
+        self.output_dir = output_dir
+        self.interval = interval
+        self.max_files = max_files
+        self.max_age = max_age
+        self.key = uuid.uuid4().hex
+        self.endpoint = 'unknown'
+        self.started_at = time.time()
+        self.output_path = None
+        self.stacks = Counter()
+        self.profiles = []
+        self._threads = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def attach(self, role):
+        """Mendaftarkan thread saat ini; pasangkan dengan detach()."""
+        profile = None
+        if self.mode == 'pstats':
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+ hanya mengizinkan satu profiler aktif sekaligus. Jika
+                # thread pertama pun gagal, pakai sampler agar tetap ada file output
+                profile = None
+                with self._lock:
+                    if not self.profiles and not self._threads:
+                        self.mode = 'collapsed'
+        with self._lock:
+            self._threads[threading.get_ident()] = role
+            self._pending += 1
+            if profile is not None:
+                self.profiles.append(profile)
+            if self.mode == 'collapsed' and self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name='profile-sampler', daemon=True)
+                self._sampler.start()
+        return profile
+
+    def detach(self, profile=None):
+        if profile is not None:
+            profile.disable()
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+            self._pending -= 1
+            finished = self._pending == 0
+        if finished:
+            self._finish()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self._threads.items())
+            for ident, role in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[f'{role};{collapse_stack(frame)}'] += 1
+
+    def _finish(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))
+        extension = 'collapsed' if self.mode == 'collapsed' else 'pstats'
+        self.output_path = os.path.join(self.output_dir, f'{self.key}-{self.endpoint}-{stamp}.{extension}')
+
+        if self.mode == 'collapsed':
+            with open(self.output_path, 'w') as output:
+                for stack, count in self.stacks.most_common():
+                    output.write(f'{stack} {count}\n')
+        elif self.profiles:
+            stats = pstats.Stats(self.profiles[0])
+            for profile in self.profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(self.output_path)
+
+        prune_profiles(self.output_dir, self.max_files, self.max_age)
+
+
+def prune_profiles(output_dir, max_files, max_age):
+    """Menghapus profil yang lebih tua dari `max_age` detik dan yang terlama di atas `max_files`."""
+    try:
+        entries = sorted(((entry.stat().st_mtime, entry.path) for entry in os.scandir(output_dir)
+                          if entry.is_file()), reverse=True)
+    except FileNotFoundError:
+        return
+    now = time.time()
+    for index, (mtime, path) in enumerate(entries):
+        if (max_files and index >= max_files) or (max_age and now - mtime > max_age):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def current_session():
+    return g.get('profile_session') if has_app_context() else None
+
+
+def propagate_profile(target):
+    """Membungkus target thread latar agar ikut diprofil bila request sedang diprofil.
+
+    Tanpa sesi aktif, target dikembalikan apa adanya.
+    """
+    session = current_session()
+    if session is None:
+        return target
+
+    # Daftarkan sekarang agar sesi tidak ditutup sebelum thread sempat berjalan
+    with session._lock:
+        session._pending += 1
+
+    def run(*args, **kwargs):
+        profile = session.attach('background')
+        with session._lock:
+            session._pending -= 1
+        try:
+            return target(*args, **kwargs)
+        finally:
+            session.detach(profile)
+
+    return run
+
+
+def safe_key(value):
+    """Nilai dari klien yang aman dipakai di nama file, atau None bila tidak tersisa apa pun."""
+    return secure_filename(str(value))[:PROFILE_KEY_MAX_LENGTH] or None
+
+
+def profile_key(response):
+    """batch_id / project_id dari URL atau body JSON respons, bila ada."""
+    view_args = request.view_args or {}
+    for name in ('project_id', 'batch_id'):
+        if view_args.get(name):
+            return safe_key(view_args[name])
+    if response.is_json and not response.is_streamed:
+        body = response.get_json(silent=True)
+        if isinstance(body, dict):
+            for name in ('project_id', 'batch_id'):
+                if body.get(name):
+                    return safe_key(body[name])
+    return None
+
+
+def init_profiling(app):
+    """Mendaftarkan hook profiling per request bila diaktifkan lewat konfigurasi.
+
+    PROFILE_TOKEN: request dengan header `X-Profile: <token>` akan diprofil.
+    PROFILE_SAMPLE_RATE: probabilitas (0-1) sebuah request diprofil secara acak.
+    Jika keduanya kosong, tidak ada hook yang didaftarkan sama sekali.
+    PROFILE_MAX_FILES / PROFILE_MAX_AGE_SECONDS: retensi file di PROFILE_DIR.
+    """
+    app.config.setdefault('PROFILE_TOKEN', os.getenv('PROFILE_TOKEN'))
+    app.config.setdefault('PROFILE_SAMPLE_RATE', float(os.getenv('PROFILE_SAMPLE_RATE', 0)))
+    app.config.setdefault('PROFILE_MODE', os.getenv('PROFILE_MODE', 'collapsed'))
+    app.config.setdefault('PROFILE_INTERVAL_MS', float(os.getenv('PROFILE_INTERVAL_MS', 5)))
+    app.config.setdefault('PROFILE_DIR', os.getenv(
+        'PROFILE_DIR', os.path.join(app.config['UPLOAD_FOLDER'], 'profiles')))
+    app.config.setdefault('PROFILE_MAX_FILES', int(os.getenv('PROFILE_MAX_FILES', 100)))
+    app.config.setdefault('PROFILE_MAX_AGE_SECONDS', int(os.getenv('PROFILE_MAX_AGE_SECONDS', 86400)))
+
+    token = app.config['PROFILE_TOKEN']
+    sample_rate = app.config['PROFILE_SAMPLE_RATE']
+    if not token and sample_rate <= 0:
+        return
+    if app.config['PROFILE_MODE'] not in PROFILE_MODES:
+        raise ValueError(f"PROFILE_MODE must be one of {', '.join(PROFILE_MODES)}")
+
+    def should_profile():
+        header = request.headers.get(PROFILE_HEADER)
+        # Dibandingkan sebagai bytes: compare_digest menolak str non-ASCII dengan TypeError
+        if token and header and hmac.compare_digest(header.encode(), token.encode()):
+            return True
+        return sample_rate > 0 and random.random() < sample_rate
+
+    @app.before_request
+    def start_profile():
+        if not should_profile():
+            return
+        session = ProfileSession(app.config['PROFILE_MODE'], app.config['PROFILE_DIR'],
+                                 app.config['PROFILE_INTERVAL_MS'] / 1000,
+                                 max_files=app.config['PROFILE_MAX_FILES'],
+                                 max_age=app.config['PROFILE_MAX_AGE_SECONDS'])
+        session.endpoint = (request.endpoint or 'unmatched').replace('.', '-')
+        g.profile_session = session
+        g.profile_handle = session.attach('request')
+
+    @app.after_request
+    def tag_profile(response):
+        session = current_session()
+        if session is not None:
+            session.key = profile_key(response) or session.key
+            response.headers['X-Profile-Id'] = session.key
+        return response
+
+    @app.teardown_request
+    def stop_profile(exc):
+        session = g.pop('profile_session', None)
+        if session is not None:
+            session.detach(g.pop('profile_handle', None))
@@ -1,29 +1,59 @@
 # tools/project.py
-from flask import Blueprint, request, jsonify, render_template
-import google.generativeai as genai
+from flask import Blueprint, Response, request, jsonify, render_template, send_file, current_app
 import os
 import time
 import uuid
 import threading
 import re
-from bs4 import BeautifulSoup
+import math
 from dotenv import load_dotenv
+from otherTools.modelchain import GenerationError, create_model_chain
+from otherTools.projectcodec import build_shared_fragments, compact_project, expand_page, expand_project, render_preview
+from otherTools.projectexport import export_filename, prune_export_cache, stream_project_zip
+from otherTools.projectstore import create_project_store
+from middleware.metrics import REGISTRY, WORK_IN_FLIGHT, stage_timer
+from middleware.profiling import propagate_profile
 
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini AI
-genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-model = genai.GenerativeModel('gemini-2.5-pro')
+# Rantai model Gemini (timeout, fallback, hedging) dibuat saat request pertama yang
+# membutuhkannya (lihat get_model_chain), agar cold start endpoint lain tidak ikut
+# membayar import SDK. Dapat diganti dengan ModelChain berisi model palsu untuk pengujian.
+model_chain = None
+model_chain_lock = threading.Lock()
 
 # Create blueprint
 project_bp = Blueprint('project', __name__, url_prefix='/api/ai-agentweb')
 
-# In-memory storage for projects
-projects = {}
+# Project storage (memory LRU/TTL atau SQLite, lihat PROJECT_STORE)
+projects = create_project_store()
+
+# Ukuran store per status, dihitung saat /metrics di-scrape
+REGISTRY.gauge('project_store_size', 'Jumlah proyek di store per status.', ('status',),
+               callback=lambda: {(status,): projects.count(status)
+                                 for status in ('processing', 'completed', 'error')})
+
+# Batas maksimum lama request long-poll pada /project/<id>/status?wait=N
+LONG_POLL_MAX_SECONDS = float(os.getenv('LONG_POLL_MAX_SECONDS', 25))
+
+# Batas total ukuran cache arsip ekspor di UPLOAD_FOLDER/exports; arsip juga
+# kedaluwarsa bersama proyeknya (PROJECT_TTL_SECONDS)
+EXPORT_CACHE_MAX_BYTES = int(float(os.getenv('EXPORT_CACHE_MB', 200)) * 1024 * 1024)
+
+def get_model_chain():
+    """Membuat rantai model dari environment pada pemanggilan pertama."""
+    global model_chain
+    if model_chain is None:
+        with model_chain_lock:
+            if model_chain is None:
+                model_chain = create_model_chain()
+    return model_chain
 
 def parse_ai_response(content):
     """Mem-parsing respons AI menjadi komponen terstruktur untuk multi-halaman."""
+    from bs4 import BeautifulSoup
+
     result = {
         'title': 'Aplikasi Dihasilkan AI',
         'description': 'Deskripsi tidak tersedia.',
@@ -92,53 +122,32 @@ def parse_ai_response(content):
     return result
 
 def inject_shared_elements(pages, title):
-    """Menambahkan navigasi, header, dan footer yang konsisten ke semua halaman."""
-    if not pages:
-        return
+    """Menyiapkan navigasi, header, dan footer yang konsisten untuk semua halaman.
 
-    nav_items = []
-    for name, data in pages.items():
-        display_name = name.replace('_', ' ').title()
-        nav_items.append(f'<li><a href="#" data-page="{name}">{display_name}</a></li>')
-    
-    nav_html = f'<nav class="app-nav"><ul>{"".join(nav_items)}</ul></nav>'
-    header_html = f'<header class="app-header"><h1>{title}</h1>{nav_html}</header>'
-    footer_html = '<footer class="app-footer"><p>Dihasilkan oleh AI App Builder</p></footer>'
-
-    shared_css = """
-        body { margin: 0; font-family: sans-serif; }
-        .app-header { background: #f1f1f1; padding: 20px; border-bottom: 1px solid #ddd; display: flex; justify-content: space-between; align-items: center; }
-        .app-header h1 { margin: 0; font-size: 24px; }
-        .app-nav ul { list-style: none; margin: 0; padding: 0; display: flex; gap: 20px; }
-        .app-nav a { text-decoration: none; color: #333; font-weight: bold; }
-        .app-nav a:hover { color: #007bff; }
-        .app-main { padding: 20px; min-height: 70vh; }
-        .app-footer { background: #333; color: white; text-align: center; padding: 15px; }
+    Fragmen bersama dikembalikan sekali per proyek; setiap halaman hanya
+    menyimpan isi body-nya sendiri (lihat projectcodec.page_html).
     """
+    if not pages:
+        return None
+
+    from bs4 import BeautifulSoup
+
+    shared = build_shared_fragments(pages, title)
 
     for name, data in pages.items():
         soup = BeautifulSoup(data['html'], 'html.parser')
         
-        # Hapus body tag jika ada, kita akan buat ulang
+        # Hapus body tag jika ada, header/footer dirakit saat dirender
         body_tag = soup.find('body')
         if body_tag:
-            body_content = body_tag.decode_contents()
-        else:
-            body_content = data['html']
-
-        # Buat struktur baru yang konsisten
-        full_html_structure = f"""
-        {header_html}
-        <main class="app-main">
-            {body_content}
-        </main>
-        {footer_html}
-        """
-        data['html'] = full_html_structure
-        data['css'] = shared_css + "\n" + data.get('css', '')
+            data['html'] = body_tag.decode_contents()
 
-def generate_ai_response(prompt, project_id):
-    """Menghasilkan dan memproses respons dari AI."""
+    return shared
+
+def generate_ai_response(prompt, project_id, deadline=None):
+    """Menghasilkan dan memproses respons dari AI dalam batas `deadline` detik."""
+    WORK_IN_FLIGHT.labels('ai_generate').inc()
+    generation = None
     try:
         enhanced_prompt = f"""
         Anda adalah AI developer full-stack yang sangat canggih. Tugas Anda adalah membuat aplikasi web multi-halaman yang modern dan fungsional berdasarkan permintaan pengguna.
@@ -175,77 +184,192 @@ def generate_ai_response(prompt, project_id):
 # 2. Jalankan server Flask jika ada.]
         """
         
-        response = model.generate_content(enhanced_prompt)
-        parsed_response = parse_ai_response(response.text)
+        # Durasi tiap percobaan dicatat oleh ModelChain sebagai tahap gemini_generate
+        text, generation = get_model_chain().generate(enhanced_prompt, deadline)
+        with stage_timer('ai_create', 'parse_ai_response'):
+            parsed_response = parse_ai_response(text)
         
         if not parsed_response['pages']:
              raise Exception("AI tidak menghasilkan konten halaman yang valid.")
 
-        inject_shared_elements(parsed_response['pages'], parsed_response['title'])
-        
-        preview_data = {'pages': {}, 'main_page': 'index'}
-        for name, data in parsed_response['pages'].items():
-            full_page_html = f"""
-            <!DOCTYPE html>
-            <html lang="id">
-            <head>
-                <meta charset="UTF-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                <title>{parsed_response['title']} | {name.title()}</title>
-                <style>{data['css']}</style>
-            </head>
-            <body>
-                {data['html']}
-                <script>
-                    document.addEventListener('DOMContentLoaded', () => {{
-                        document.querySelectorAll('.app-nav a').forEach(link => {{
-                            link.addEventListener('click', e => {{
-                                e.preventDefault();
-                                const page = e.target.getAttribute('data-page');
-                                window.parent.postMessage({{ type: 'navigate', page: page }}, '*');
-                            }});
-                        }});
-                    }});
-                </script>
-                <script>{data['js']}</script>
-            </body>
-            </html>
-            """
-            preview_data['pages'][name] = full_page_html
-
-        projects[project_id] = {
-            'status': 'completed',
-            'title': parsed_response['title'],
-            'description': parsed_response['description'],
-            'pages': parsed_response['pages'],
-            'backend': parsed_response['backend'],
-            'deployment': parsed_response['deployment'],
-            'preview': preview_data,
-            'timestamp': int(time.time())
-        }
+        with stage_timer('ai_create', 'inject_shared_elements'):
+            shared = inject_shared_elements(parsed_response['pages'], parsed_response['title'])
+
+        # Simpan dalam bentuk ringkas; preview dirender saat diminta
+        project = compact_project(parsed_response, shared)
+        project['timestamp'] = int(time.time())
+        project['generation'] = generation
+        with stage_timer('ai_create', 'store_put'):
+            projects.put(project_id, project)
 
+    except GenerationError as e:
+        print(f"Error di thread generator: {e}")
+        projects.put(project_id, {'status': 'error', 'error': str(e),
+                                  'generation': {'attempts': e.attempts}})
     except Exception as e:
         print(f"Error di thread generator: {e}")
-        projects[project_id] = {'status': 'error', 'error': str(e)}
+        projects.put(project_id, {'status': 'error', 'error': str(e), 'generation': generation})
+    finally:
+        WORK_IN_FLIGHT.labels('ai_generate').dec()
 
 @project_bp.route('/create', methods=['POST'])
 def create_project():
     prompt = request.json.get('prompt')
     if not prompt:
         return jsonify({'error': 'Prompt tidak boleh kosong'}), 400
+
+    # Deadline opsional per proyek; dibatasi GEMINI_DEADLINE di ModelChain
+    deadline = request.json.get('deadline_seconds')
+    if deadline is not None:
+        try:
+            deadline = float(deadline)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'deadline_seconds harus berupa angka'}), 400
+        # NaN lolos dari perbandingan di bawah dan membuat deadline diabaikan
+        if not math.isfinite(deadline):
+            return jsonify({'error': 'deadline_seconds harus berupa angka'}), 400
+        if deadline <= 0:
+            return jsonify({'error': 'deadline_seconds harus lebih dari 0'}), 400
     
     project_id = str(uuid.uuid4())
-    projects[project_id] = {'status': 'processing', 'prompt': prompt}
+    projects.put(project_id, {'status': 'processing', 'prompt': prompt})
     
-    thread = threading.Thread(target=generate_ai_response, args=(prompt, project_id))
+    thread = threading.Thread(target=propagate_profile(generate_ai_response),
+                              args=(prompt, project_id, deadline))
     thread.start()
     
     return jsonify({'project_id': project_id})
 
+def project_etag(project_id, project):
+    """ETag berubah setiap kali status atau hasil proyek berubah."""
+    return f"{project_id}-{project.get('status')}-{project.get('timestamp', 0)}"
+
+def project_summary(project_id, project):
+    """Respons status ringkas tanpa isi halaman, backend, maupun preview."""
+    summary = {'project_id': project_id, 'status': project.get('status')}
+    if project.get('status') == 'completed':
+        summary.update({
+            'title': project['title'],
+            'description': project['description'],
+            'pages': list(project['pages']),
+            'main_page': project.get('main_page', 'index'),
+            'timestamp': project.get('timestamp'),
+            'generation': project.get('generation')
+        })
+    elif project.get('status') == 'error':
+        summary['error'] = project.get('error')
+        summary['generation'] = project.get('generation')
+    return summary
+
+def conditional_response(response, etag, project):
+    """Memasang ETag dan header cache, lalu menjawab 304 jika If-None-Match cocok."""
+    response.set_etag(etag)
+    if project.get('status') == 'completed':
+        # Hasil proyek yang selesai tidak pernah berubah lagi
+        response.headers['Cache-Control'] = 'private, max-age=3600, immutable'
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def wait_for_change(project_id, project):
+    """Long-poll: tahan request hingga ETag proyek berubah atau timeout habis."""
+    try:
+        timeout = float(request.args.get('wait', 0))
+    except ValueError:
+        timeout = 0
+    # Tolak nan/inf agar loop di bawah tidak berputar tanpa henti
+    if not math.isfinite(timeout):
+        timeout = 0
+    timeout = max(0.0, min(timeout, LONG_POLL_MAX_SECONDS))
+    known_etags = request.if_none_match
+    # Tanpa If-None-Match, tunggu selama proyek masih diproses
+    if not known_etags and project.get('status') != 'processing':
+        return project
+
+    deadline = time.monotonic() + timeout
+    # Versi diambil sebelum record dibaca ulang agar penulisan di antaranya tidak terlewat
+    seen = projects.version()
+    project = projects.get(project_id) or project
+    while True:
+        current = project_etag(project_id, project)
+        if known_etags:
+            if not known_etags.contains_weak(current):
+                return project
+        elif project.get('status') != 'processing':
+            return project
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return project
+        projects.wait(seen, remaining)
+        seen = projects.version()
+        project = projects.get(project_id) or project
+
 @project_bp.route('/project/<project_id>')
 def get_project(project_id):
     project = projects.get(project_id)
     if not project:
         return jsonify({'error': 'Proyek tidak ditemukan'}), 404
-    return jsonify(project)
+    return conditional_response(jsonify(expand_project(project)),
+                                project_etag(project_id, project), project)
+
+@project_bp.route('/project/<project_id>/status')
+def get_project_status(project_id):
+    project = projects.get(project_id)
+    if not project:
+        return jsonify({'error': 'Proyek tidak ditemukan'}), 404
 
+    if 'wait' in request.args:
+        project = wait_for_change(project_id, project)
+
+    return conditional_response(jsonify(project_summary(project_id, project)),
+                                project_etag(project_id, project), project)
+
+def get_completed_page(project_id, page_name):
+    """Mengambil proyek selesai beserta halaman; mengembalikan (project, error_response)."""
+    project = projects.get(project_id)
+    if not project:
+        return None, (jsonify({'error': 'Proyek tidak ditemukan'}), 404)
+    if project.get('status') != 'completed':
+        return None, (jsonify({'error': 'Proyek belum selesai', 'status': project.get('status')}), 409)
+    if page_name not in project['pages']:
+        return None, (jsonify({'error': 'Halaman tidak ditemukan'}), 404)
+    return project, None
+
+@project_bp.route('/project/<project_id>/page/<page_name>')
+def get_project_page(project_id, page_name):
+    project, error = get_completed_page(project_id, page_name)
+    if error:
+        return error
+    etag = f"{project_etag(project_id, project)}-page-{page_name}"
+    return conditional_response(jsonify(expand_page(project, page_name)), etag, project)
+
+@project_bp.route('/project/<project_id>/preview/<page_name>')
+def get_project_preview(project_id, page_name):
+    project, error = get_completed_page(project_id, page_name)
+    if error:
+        return error
+    response = Response(render_preview(project, page_name), mimetype='text/html')
+    etag = f"{project_etag(project_id, project)}-preview-{page_name}"
+    return conditional_response(response, etag, project)
+
+@project_bp.route('/project/<project_id>/export')
+def export_project(project_id):
+    project = projects.get(project_id)
+    if not project:
+        return jsonify({'error': 'Proyek tidak ditemukan'}), 404
+    if project.get('status') != 'completed':
+        return jsonify({'error': 'Proyek belum selesai', 'status': project.get('status')}), 409
+
+    download_name = export_filename(project)
+    # Proyek yang selesai tidak berubah, jadi arsipnya di-cache sebagai file
+    cache_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'exports')
+    cache_path = os.path.join(cache_folder, f"{project_id}-{project.get('timestamp', 0)}.zip")
+    if os.path.exists(cache_path):
+        response = send_file(cache_path, mimetype='application/zip',
+                             as_attachment=True, download_name=download_name)
+    else:
+        prune_export_cache(cache_folder, projects.ttl, EXPORT_CACHE_MAX_BYTES)
+        response = Response(stream_project_zip(project, cache_path), mimetype='application/zip')
+        response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+    return conditional_response(response, f"{project_etag(project_id, project)}-export", project)
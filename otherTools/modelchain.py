@@ -0,0 +1,177 @@
+# otherTools/modelchain.py
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from middleware.metrics import REGISTRY, observe_stage
+
+GENERATION_ATTEMPTS = REGISTRY.counter(
+    'ai_generation_attempts_total', 'Percobaan generate_content per model dan hasil.', ('model', 'outcome'))
+
+
+class GenerationError(Exception):
+    """Semua model dalam rantai gagal atau deadline proyek habis."""
+
+    def __init__(self, message, attempts):
+        super().__init__(message)
+        self.attempts = attempts
+
+
+def call_in_thread(func, *args, **kwargs):
+    """Menjalankan func di thread daemon tersendiri dan mengembalikan Future.
+
+    Panggilan SDK tidak bisa dibatalkan; dengan thread sendiri panggilan yang
+    macet hanya ditinggalkan tanpa menghabiskan pool bersama.
+    """
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name='ai-generate', daemon=True).start()
+    return future
+
+
+class ModelChain:
+    """Rantai model berurutan dengan timeout per panggilan, deadline total, dan hedging.
+
+    models: nama model berurutan, misalnya ['gemini-2.5-pro', 'gemini-2.5-flash'].
+    factory: callable(nama) -> objek dengan generate_content(prompt, request_options=...).
+    hedge_percentile: jika > 0, kirim request kedua ke model yang sama ketika
+    request pertama melewati persentil latensi ini; ambil yang selesai duluan.
+    """
+
+    def __init__(self, models, factory, call_timeout=120, deadline=240,
+                 hedge_percentile=0.0, hedge_min_samples=20, history_size=200):
+        if not models:
+            raise ValueError('ModelChain membutuhkan minimal satu model')
+        self.models = list(models)
+        self.factory = factory
+        self.call_timeout = call_timeout
+        self.deadline = deadline
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self._instances = {}
+        self._latencies = {name: deque(maxlen=history_size) for name in self.models}
+        self._lock = threading.Lock()
+
+    def get_model(self, name):
+        with self._lock:
+            if name not in self._instances:
+                self._instances[name] = self.factory(name)
+            return self._instances[name]
+
+    def hedge_delay(self, name):
+        """Latensi persentil dari riwayat sukses model, atau None bila hedging nonaktif."""
+        if self.hedge_percentile <= 0:
+            return None
+        with self._lock:
+            history = sorted(self._latencies[name])
+        if len(history) < self.hedge_min_samples:
+            return None
+        index = min(len(history) - 1, int(len(history) * self.hedge_percentile))
+        return history[index]
+
+    def _call(self, name, prompt, timeout):
+        model = self.get_model(name)
+        return call_in_thread(model.generate_content, prompt, request_options={'timeout': timeout})
+
+    def _attempt(self, name, prompt, timeout):
+        """Satu percobaan (dengan hedge opsional). Mengembalikan (teks, hedged)."""
+        started = time.monotonic()
+        futures = [self._call(name, prompt, timeout)]
+        hedged = False
+
+        delay = self.hedge_delay(name)
+        if delay is not None and delay < timeout:
+            done, _ = wait(futures, timeout=delay)
+            if not done:
+                futures.append(self._call(name, prompt, timeout - delay))
+                hedged = True
+
+        remaining = timeout - (time.monotonic() - started)
+        pending = set(futures)
+        error = None
+        while pending and remaining > 0:
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    with self._lock:
+                        self._latencies[name].append(time.monotonic() - started)
+                    return future.result().text, hedged
+                error = future.exception()
+            remaining = timeout - (time.monotonic() - started)
+
+        if pending:
+            raise TimeoutError(f'{name} tidak merespons dalam {timeout:.1f} detik')
+        raise error
+
+    def generate(self, prompt, deadline=None):
+        """Mencoba setiap model berurutan hingga berhasil atau deadline habis.
+
+        Mengembalikan (teks, info) dengan info berisi model dan percobaan yang
+        menghasilkan teks beserta riwayat semua percobaan.
+        """
+        deadline = min(deadline or self.deadline, self.deadline)
+        started = time.monotonic()
+        attempts = []
+
+        for number, name in enumerate(self.models, start=1):
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            timeout = min(self.call_timeout, remaining)
+            attempt_started = time.monotonic()
+            try:
+                text, hedged = self._attempt(name, prompt, timeout)
+            except TimeoutError as e:
+                outcome, detail, hedged = 'timeout', str(e), False
+            except Exception as e:
+                outcome, detail, hedged = 'error', str(e), False
+            else:
+                outcome, detail = 'ok', None
+
+            seconds = time.monotonic() - attempt_started
+            observe_stage('ai_create', 'gemini_generate', seconds)
+            GENERATION_ATTEMPTS.labels(name, outcome).inc()
+            attempts.append({'model': name, 'attempt': number, 'outcome': outcome,
+                             'seconds': round(seconds, 3), 'hedged': hedged, 'error': detail})
+            if outcome == 'ok':
+                return text, {'model': name, 'attempt': number, 'hedged': hedged,
+                              'seconds': round(time.monotonic() - started, 3), 'attempts': attempts}
+
+        raise GenerationError(
+            f'Semua model gagal atau deadline {deadline:.1f} detik habis', attempts)
+
+
+def create_gemini_model(name):
+    """Factory default: mengimport dan mengonfigurasi SDK Gemini saat pertama dipakai."""
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+    return genai.GenerativeModel(name)
+
+
+def create_model_chain(factory=create_gemini_model):
+    """Membuat rantai model dari environment.
+
+    GEMINI_MODELS: daftar model dipisah koma (default gemini-2.5-pro,gemini-2.5-flash).
+    GEMINI_CALL_TIMEOUT / GEMINI_DEADLINE: detik per panggilan / total per proyek.
+    GEMINI_HEDGE_PERCENTILE: mis. 0.95 untuk hedging; 0 menonaktifkan.
+    """
+    models = [name.strip() for name in
+              os.getenv('GEMINI_MODELS', 'gemini-2.5-pro,gemini-2.5-flash').split(',') if name.strip()]
+    return ModelChain(
+        models,
+        factory,
+        call_timeout=float(os.getenv('GEMINI_CALL_TIMEOUT', 120)),
+        deadline=float(os.getenv('GEMINI_DEADLINE', 240)),
+        hedge_percentile=float(os.getenv('GEMINI_HEDGE_PERCENTILE', 0)),
+        hedge_min_samples=int(os.getenv('GEMINI_HEDGE_MIN_SAMPLES', 20))
+    )
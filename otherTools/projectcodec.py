@@ -0,0 +1,167 @@
+# otherTools/projectcodec.py
+import zlib
+
+# Fragmen bersama yang identik untuk semua proyek. Disimpan sekali di level modul
+# sehingga setiap record proyek hanya menyimpan referensi ke string yang sama.
+SHARED_CSS = """
+        body { margin: 0; font-family: sans-serif; }
+        .app-header { background: #f1f1f1; padding: 20px; border-bottom: 1px solid #ddd; display: flex; justify-content: space-between; align-items: center; }
+        .app-header h1 { margin: 0; font-size: 24px; }
+        .app-nav ul { list-style: none; margin: 0; padding: 0; display: flex; gap: 20px; }
+        .app-nav a { text-decoration: none; color: #333; font-weight: bold; }
+        .app-nav a:hover { color: #007bff; }
+        .app-main { padding: 20px; min-height: 70vh; }
+        .app-footer { background: #333; color: white; text-align: center; padding: 15px; }
+    """
+
+FOOTER_HTML = '<footer class="app-footer"><p>Dihasilkan oleh AI App Builder</p></footer>'
+
+PREVIEW_NAV_SCRIPT = """
+                <script>
+                    document.addEventListener('DOMContentLoaded', () => {
+                        document.querySelectorAll('.app-nav a').forEach(link => {
+                            link.addEventListener('click', e => {
+                                e.preventDefault();
+                                const page = e.target.getAttribute('data-page');
+                                window.parent.postMessage({ type: 'navigate', page: page }, '*');
+                            });
+                        });
+                    });
+                </script>"""
+
+BLOB_FIELDS = ('backend', 'deployment')
+
+
+def pack_blob(text):
+    """Mengompresi teks yang jarang dibaca (backend, deployment) menjadi bytes."""
+    if not text:
+        return b''
+    return zlib.compress(text.encode('utf-8'), 6)
+
+
+def unpack_blob(blob):
+    """Kebalikan dari pack_blob. String biasa dikembalikan apa adanya."""
+    if not blob:
+        return ''
+    if isinstance(blob, str):
+        return blob
+    return zlib.decompress(blob).decode('utf-8')
+
+
+def build_shared_fragments(pages, title):
+    """Membangun header/nav, footer, dan CSS bersama sekali per proyek."""
+    nav_items = []
+    for name in pages:
+        display_name = name.replace('_', ' ').title()
+        nav_items.append(f'<li><a href="#" data-page="{name}">{display_name}</a></li>')
+
+    nav_html = f'<nav class="app-nav"><ul>{"".join(nav_items)}</ul></nav>'
+    header_html = f'<header class="app-header"><h1>{title}</h1>{nav_html}</header>'
+
+    return {'header': header_html, 'footer': FOOTER_HTML, 'css': SHARED_CSS}
+
+
+def compact_project(parsed, shared):
+    """Membuat record proyek ringkas dari hasil parse_ai_response.
+
+    Setiap halaman hanya menyimpan isi body, CSS, dan JS miliknya sendiri;
+    header, footer, dan CSS bersama disimpan sekali di `shared`. Preview tidak
+    disimpan sama sekali, melainkan dirender saat diminta.
+    """
+    pages = {}
+    for name, data in parsed['pages'].items():
+        pages[name] = {
+            'body': data['html'],
+            'css': data.get('css', ''),
+            'js': data.get('js', ''),
+            'filename': data['filename']
+        }
+
+    record = {
+        'status': 'completed',
+        'title': parsed['title'],
+        'description': parsed['description'],
+        'shared': shared,
+        'pages': pages,
+        'main_page': 'index' if 'index' in pages else next(iter(pages), 'index')
+    }
+    for field in BLOB_FIELDS:
+        record[field] = pack_blob(parsed.get(field, ''))
+
+    return record
+
+
+def page_html(record, name):
+    """HTML lengkap satu halaman (header + konten + footer)."""
+    shared = record['shared']
+    page = record['pages'][name]
+    return f"""
+        {shared['header']}
+        <main class="app-main">
+            {page['body']}
+        </main>
+        {shared['footer']}
+        """
+
+
+def page_css(record, name):
+    """CSS halaman, diawali CSS bersama milik proyek."""
+    return record['shared']['css'] + "\n" + record['pages'][name]['css']
+
+
+def expand_page(record, name):
+    """Bentuk halaman seperti pada respons API lama."""
+    page = record['pages'][name]
+    return {
+        'html': page_html(record, name),
+        'css': page_css(record, name),
+        'js': page['js'],
+        'filename': page['filename']
+    }
+
+
+def render_preview(record, name):
+    """Merender dokumen HTML preview untuk satu halaman secara lazy."""
+    page = record['pages'][name]
+    return f"""
+            <!DOCTYPE html>
+            <html lang="id">
+            <head>
+                <meta charset="UTF-8">
+                <meta name="viewport" content="width=device-width, initial-scale=1.0">
+                <title>{record['title']} | {name.title()}</title>
+                <style>{page_css(record, name)}</style>
+            </head>
+            <body>
+                {page_html(record, name)}{PREVIEW_NAV_SCRIPT}
+                <script>{page['js']}</script>
+            </body>
+            </html>
+            """
+
+
+def expand_project(record, include_preview=True):
+    """Mengembalikan record ringkas ke bentuk JSON lengkap yang dipakai klien.
+
+    Record dengan status selain 'completed' dikembalikan apa adanya.
+    """
+    if record.get('status') != 'completed' or 'shared' not in record:
+        return dict(record)
+
+    names = list(record['pages'])
+    project = {
+        'status': record['status'],
+        'title': record['title'],
+        'description': record['description'],
+        'pages': {name: expand_page(record, name) for name in names},
+        'backend': unpack_blob(record.get('backend')),
+        'deployment': unpack_blob(record.get('deployment')),
+        'timestamp': record.get('timestamp'),
+        'generation': record.get('generation')
+    }
+    if include_preview:
+        project['preview'] = {
+            'pages': {name: render_preview(record, name) for name in names},
+            'main_page': record.get('main_page', 'index')
+        }
+    return project
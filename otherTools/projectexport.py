@@ -0,0 +1,189 @@
+# otherTools/projectexport.py
+import os
+import re
+import time
+import uuid
+import zipfile
+from werkzeug.utils import secure_filename
+from otherTools.projectcodec import unpack_blob
+
+BACKEND_NOT_NEEDED = 'TIDAK DIPERLUKAN'
+
+
+class ZipStream:
+    """Objek file tulis-saja (tanpa seek) yang menampung output zipfile per potongan."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def export_filename(project):
+    slug = re.sub(r'[^a-z0-9]+', '-', project.get('title', '').lower()).strip('-')
+    return f"{slug or 'project'}.zip"
+
+
+def export_names(project):
+    """Nama file aman per halaman: {nama: (file html, nama dasar aset)}.
+
+    Nama halaman berasal dari output AI dan bisa berisi '/' atau '../', jadi
+    dilewatkan ke secure_filename dan dibuat unik di dalam arsip.
+    """
+    names = {}
+    used = {'README.md', 'app.py', 'shared'}
+    for name, page in project['pages'].items():
+        stem = os.path.splitext(secure_filename(page['filename']))[0] or secure_filename(name) or 'page'
+        candidate, n = stem, 1
+        while candidate in used:
+            n += 1
+            candidate = f'{stem}-{n}'
+        used.add(candidate)
+        names[name] = (f'{candidate}.html', candidate)
+    return names
+
+
+def export_page_html(project, name, names=None):
+    """Dokumen HTML mandiri untuk satu halaman dengan CSS/JS sebagai file terpisah."""
+    names = names or export_names(project)
+    shared = project['shared']
+    page = project['pages'][name]
+    asset = names[name][1]
+
+    # Navigasi preview memakai data-page; di hasil ekspor arahkan ke file halaman
+    header = shared['header']
+    for other_name in project['pages']:
+        header = header.replace(f'href="#" data-page="{other_name}"',
+                                f'href="{names[other_name][0]}" data-page="{other_name}"')
+
+    styles = '<link rel="stylesheet" href="assets/shared.css">'
+    if page['css']:
+        styles += f'\n    <link rel="stylesheet" href="assets/{asset}.css">'
+    script = f'\n    <script src="assets/{asset}.js"></script>' if page['js'] else ''
+
+    return f"""<!DOCTYPE html>
+<html lang="id">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{project['title']} | {name.title()}</title>
+    {styles}
+</head>
+<body>
+    {header}
+    <main class="app-main">
+        {page['body']}
+    </main>
+    {shared['footer']}{script}
+</body>
+</html>
+"""
+
+
+def iter_export_entries(project):
+    """Menghasilkan pasangan (path dalam arsip, isi) untuk proyek yang selesai."""
+    readme = f"# {project['title']}\n\n{project['description']}\n"
+    deployment = unpack_blob(project.get('deployment'))
+    if deployment:
+        readme += f"\n## Instruksi Deploy\n\n{deployment}\n"
+    yield 'README.md', readme
+
+    yield 'assets/shared.css', project['shared']['css']
+    names = export_names(project)
+    for name, page in project['pages'].items():
+        filename, asset = names[name]
+        yield filename, export_page_html(project, name, names)
+        if page['css']:
+            yield f'assets/{asset}.css', page['css']
+        if page['js']:
+            yield f'assets/{asset}.js', page['js']
+
+    backend = unpack_blob(project.get('backend'))
+    if backend and BACKEND_NOT_NEEDED not in backend.upper():
+        yield 'app.py', backend
+
+
+def stream_project_zip(project, cache_path=None):
+    """Generator potongan byte ZIP, dibuat langsung dari record proyek.
+
+    Jika `cache_path` diberikan, arsip juga ditulis ke file sementara dan
+    dipindahkan ke `cache_path` setelah selesai, sehingga request berikutnya
+    dapat langsung mengirim file tersebut.
+    """
+    cache_file = None
+    temp_path = None
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+        cache_file = open(temp_path, 'wb')
+
+    stream = ZipStream()
+    completed = False
+    try:
+        with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for path, content in iter_export_entries(project):
+                archive.writestr(path, content)
+                chunk = stream.drain()
+                if cache_file:
+                    cache_file.write(chunk)
+                yield chunk
+
+        chunk = stream.drain()
+        if cache_file:
+            cache_file.write(chunk)
+        yield chunk
+        completed = True
+    finally:
+        if cache_file:
+            cache_file.close()
+            if completed:
+                os.replace(temp_path, cache_path)
+            elif os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+def prune_export_cache(folder, max_age, max_bytes):
+    """Menghapus arsip cache yang lebih tua dari `max_age` detik, lalu yang
+    terlama hingga total ukuran folder di bawah `max_bytes`.
+
+    Dipanggil sebelum arsip baru ditulis; mengembalikan jumlah file yang dihapus.
+    """
+    try:
+        entries = [entry for entry in os.scandir(folder) if entry.is_file()]
+    except FileNotFoundError:
+        return 0
+
+    now = time.time()
+    files = sorted(((entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries),
+                   reverse=True)
+    total = 0
+    removed = 0
+    for mtime, size, path in files:
+        expired = max_age and now - mtime > max_age
+        if path.endswith('.tmp') and not expired:
+            # Arsip yang sedang ditulis; hanya sisa request yang gagal yang dihapus
+            continue
+        total += size
+        if expired or (max_bytes and total > max_bytes):
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+    return removed
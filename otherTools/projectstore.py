@@ -0,0 +1,246 @@
+# otherTools/projectstore.py
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Batas jumlah proyek default untuk kedua backend (PROJECT_STORE_MAX_ITEMS)
+DEFAULT_MAX_ITEMS = 1000
+
+
+class ProjectStore:
+    """Antarmuka penyimpanan proyek yang dipakai oleh blueprint AI agent."""
+
+    def get(self, project_id):
+        raise NotImplementedError
+
+    def put(self, project_id, record):
+        raise NotImplementedError
+
+    def delete(self, project_id):
+        raise NotImplementedError
+
+    def count(self, status=None):
+        raise NotImplementedError
+
+    def expire(self):
+        """Menghapus proyek yang melewati TTL. Mengembalikan jumlah yang dihapus."""
+        raise NotImplementedError
+
+    def version(self):
+        """Penanda penulisan terakhir; ambil sebelum membaca record yang akan ditunggu."""
+        return None
+
+    def wait(self, seen, timeout):
+        """Menunggu hingga version() berbeda dari `seen` atau timeout (dipakai long-poll).
+
+        Implementasi dasar hanya tidur sebentar; pemanggil wajib memeriksa
+        ulang record setelah kembali.
+        """
+        time.sleep(min(timeout, 0.5))
+
+
+class MemoryProjectStore(ProjectStore):
+    """Penyimpanan in-process dengan batas jumlah (LRU) dan TTL."""
+
+    def __init__(self, max_items=DEFAULT_MAX_ITEMS, ttl=86400):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        # Naik setiap penulisan; long-poll menunggu perubahan nilai ini di bawah lock
+        self._version = 0
+
+    def _is_expired(self, updated_at, now):
+        return self.ttl and now - updated_at > self.ttl
+
+    def get(self, project_id):
+        now = time.time()
+        with self._lock:
+            entry = self._items.get(project_id)
+            if entry is None:
+                return None
+            record, updated_at = entry
+            if self._is_expired(updated_at, now):
+                del self._items[project_id]
+                return None
+            self._items.move_to_end(project_id)
+            return record
+
+    def put(self, project_id, record):
+        with self._lock:
+            self._items[project_id] = (record, time.time())
+            self._items.move_to_end(project_id)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+            self._version += 1
+            self._changed.notify_all()
+
+    def delete(self, project_id):
+        with self._lock:
+            self._items.pop(project_id, None)
+
+    def count(self, status=None):
+        with self._lock:
+            if status is None:
+                return len(self._items)
+            return sum(1 for record, _ in self._items.values() if record.get('status') == status)
+
+    def expire(self):
+        now = time.time()
+        with self._lock:
+            expired = [pid for pid, (_, updated_at) in self._items.items()
+                       if self._is_expired(updated_at, now)]
+            for pid in expired:
+                del self._items[pid]
+        return len(expired)
+
+    def version(self):
+        with self._lock:
+            return self._version
+
+    def wait(self, seen, timeout):
+        # wait_for memeriksa versi di bawah lock, jadi put() di antara
+        # version() dan wait() tidak terlewat
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != seen, timeout)
+
+
+def _encode_value(value):
+    # Blob terkompresi (lihat projectcodec.pack_blob) disimpan sebagai base64
+    if isinstance(value, bytes):
+        return {'__blob__': base64.b64encode(value).decode('ascii')}
+    raise TypeError(f"Tipe tidak dapat diserialisasi: {type(value).__name__}")
+
+
+def _decode_value(obj):
+    if len(obj) == 1 and '__blob__' in obj:
+        return base64.b64decode(obj['__blob__'])
+    return obj
+
+
+class SQLiteProjectStore(ProjectStore):
+    """Penyimpanan SQLite (WAL) yang dapat dibagi antar worker pada host yang sama.
+
+    Proyek kedaluwarsa dihapus secara berkala saat penulisan, paling sering
+    sekali setiap `expire_interval` detik.
+    """
+
+    def __init__(self, path, max_items=DEFAULT_MAX_ITEMS, ttl=86400, expire_interval=60):
+        self.path = path
+        self.max_items = max_items
+        self.ttl = ttl
+        self.expire_interval = expire_interval
+        self._local = threading.local()
+        self._last_expire = 0.0
+        # Koneksi milik proses induk yang terbawa fork; disimpan agar tidak
+        # ditutup (atau dipakai) dari proses anak
+        self._inherited = []
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Koneksi skema ditutup lagi: store dibuat saat import, yang dengan
+        # gunicorn --preload terjadi sebelum fork
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS projects (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_projects_status ON projects (status);
+            CREATE INDEX IF NOT EXISTS idx_projects_updated_at ON projects (updated_at);
+        """)
+        conn.close()
+
+    def _connect(self):
+        # Satu koneksi per thread dan per proses; SQLite melarang memakai
+        # koneksi yang dibuka sebelum fork()
+        conn = getattr(self._local, 'conn', None)
+        pid = os.getpid()
+        if conn is not None and self._local.pid != pid:
+            self._inherited.append(conn)
+            conn = None
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=10000')
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    def get(self, project_id):
+        row = self._connect().execute(
+            'SELECT data FROM projects WHERE id = ? AND updated_at >= ?',
+            (project_id, self._cutoff())
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0], object_hook=_decode_value)
+
+    def put(self, project_id, record):
+        data = json.dumps(record, default=_encode_value, separators=(',', ':'))
+        self._connect().execute(
+            'INSERT OR REPLACE INTO projects (id, status, updated_at, data) VALUES (?, ?, ?, ?)',
+            (project_id, record.get('status', ''), time.time(), data)
+        )
+        if time.monotonic() - self._last_expire > self.expire_interval:
+            self.expire()
+
+    def delete(self, project_id):
+        self._connect().execute('DELETE FROM projects WHERE id = ?', (project_id,))
+
+    def count(self, status=None):
+        conn = self._connect()
+        if status is None:
+            row = conn.execute('SELECT COUNT(*) FROM projects WHERE updated_at >= ?',
+                               (self._cutoff(),)).fetchone()
+        else:
+            row = conn.execute('SELECT COUNT(*) FROM projects WHERE status = ? AND updated_at >= ?',
+                               (status, self._cutoff())).fetchone()
+        return row[0]
+
+    def expire(self):
+        self._last_expire = time.monotonic()
+        conn = self._connect()
+        removed = conn.execute('DELETE FROM projects WHERE updated_at < ?', (self._cutoff(),)).rowcount
+        if self.max_items:
+            removed += conn.execute("""
+                DELETE FROM projects WHERE id IN (
+                    SELECT id FROM projects ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_items,)).rowcount
+        return removed
+
+    def _cutoff(self):
+        return time.time() - self.ttl if self.ttl else 0
+
+
+def create_project_store():
+    """Membuat store sesuai konfigurasi environment.
+
+    PROJECT_STORE=memory (default) atau sqlite. Gunakan sqlite ketika aplikasi
+    berjalan dengan beberapa worker gunicorn di host yang sama.
+    PROJECT_STORE_MAX_ITEMS: batas jumlah proyek untuk kedua backend (default 1000).
+    """
+    backend = os.getenv('PROJECT_STORE', 'memory').lower()
+    ttl = int(os.getenv('PROJECT_TTL_SECONDS', 86400))
+
+    if backend == 'sqlite':
+        return SQLiteProjectStore(
+            os.getenv('PROJECT_STORE_PATH', '/tmp/projects.db'),
+            max_items=int(os.getenv('PROJECT_STORE_MAX_ITEMS', DEFAULT_MAX_ITEMS)),
+            ttl=ttl
+        )
+    return MemoryProjectStore(
+        max_items=int(os.getenv('PROJECT_STORE_MAX_ITEMS', DEFAULT_MAX_ITEMS)),
+        ttl=ttl
+    )
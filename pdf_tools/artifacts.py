@@ -0,0 +1,362 @@
+import hashlib
+import io
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from flask import current_app, jsonify, send_file, send_from_directory
+from werkzeug.utils import secure_filename
+from middleware.metrics import REGISTRY
+
+ARTIFACT_SPILLS = REGISTRY.counter(
+    'artifact_spills_total', 'Artifacts written to disk instead of being kept in memory.', ('reason',))
+
+# Read size for file-like streams, so deciding to spill never reads a whole upload at once
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class Artifact:
+    """One file of a batch, held either as bytes in memory or as a file on disk"""
+
+    __slots__ = ('name', 'role', 'size', 'data', 'path', 'created_at', '_digest')
+
+    def __init__(self, name, role, data=None, path=None, size=0):
+        self.name = name
+        self.role = role
+        self.data = data
+        self.path = path
+        self.size = len(data) if data is not None else size
+        self.created_at = time.time()
+        self._digest = None
+
+    def open(self):
+        # Keep a local reference: a concurrent spill may drop self.data
+        data = self.data
+        if data is not None:
+            return io.BytesIO(data)
+        return open(self.path, 'rb')
+
+    def read(self):
+        with self.open() as f:
+            return f.read()
+
+    def digest(self):
+        """SHA-256 of the content, computed once; renames keep it"""
+        if self._digest is None:
+            self._digest = file_digest(self.open())
+        return self._digest
+
+
+def file_digest(f):
+    digest = hashlib.sha256()
+    with f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Batch:
+    """Per-request view of the store; the manifest replaces scanning the batch folder"""
+
+    def __init__(self, store, batch_id):
+        self.store = store
+        self.id = batch_id
+        self.folder = os.path.join(store.root, batch_id)
+        self.artifacts = OrderedDict()
+        self.created_at = time.monotonic()
+
+    def get(self, name):
+        return self.store.get(self.id, name)
+
+    def put(self, name, data, role='output', persist=False):
+        return self.store.put(self.id, name, data, role, persist)
+
+    def put_stream(self, name, stream, role='output', persist=False):
+        return self.store.put_stream(self.id, name, stream, role, persist)
+
+    def save_upload(self, file_storage, name, persist=False):
+        return self.store.put_stream(self.id, name, file_storage.stream, 'input', persist)
+
+    def rename(self, name, new_name):
+        return self.store.rename(self.id, name, new_name)
+
+    def remove(self, name):
+        self.store.remove(self.id, name)
+
+    def outputs(self):
+        """Output artifacts in the order they were produced"""
+        return self.store.manifest(self.id, role='output')
+
+
+class ArtifactStore:
+    """Batch artifacts kept in memory up to a global byte budget, spilling to disk beyond it.
+
+    Artifacts larger than `max_memory_file` go straight to disk. When the
+    budget is exceeded, the oldest in-memory artifacts are written out first.
+    Files on disk use the same `<root>/<batch_id>/<name>` layout as before.
+    With `write_through` (the default) outputs are also written to disk as
+    soon as they are stored, so a download that lands on another worker still
+    finds them; memory then only saves the disk round trip for inputs and for
+    downloads served by this worker. Inputs that a later request has to read
+    (e.g. preview uploads) are written through too when stored with
+    `persist=True`. Batches are forgotten (and their folders removed) `ttl`
+    seconds after creation.
+    """
+
+    def __init__(self, root, memory_budget=64 * 1024 * 1024, max_memory_file=8 * 1024 * 1024,
+                 ttl=86400, expire_interval=60, write_through=True):
+        self.root = root
+        self.write_through = write_through
+        self.memory_budget = memory_budget
+        self.max_memory_file = min(max_memory_file, memory_budget)
+        self.ttl = ttl
+        self.expire_interval = expire_interval
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self._batches = {}
+        # (batch_id, name) of in-memory artifacts, oldest first
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_expire = time.monotonic()
+
+    def create_batch(self):
+        if time.monotonic() - self._last_expire > self.expire_interval:
+            self.expire()
+        batch = Batch(self, str(uuid.uuid4()))
+        with self._lock:
+            self._batches[batch.id] = batch
+        return batch
+
+    def get(self, batch_id, name):
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            return batch.artifacts.get(name) if batch is not None else None
+
+    def manifest(self, batch_id, role=None):
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                return []
+            return [a for a in batch.artifacts.values() if role is None or a.role == role]
+
+    def put(self, batch_id, name, data, role='output', persist=False):
+        """Store `data` under a name that is unique within the batch"""
+        if len(data) > self.max_memory_file:
+            ARTIFACT_SPILLS.labels('too_large').inc()
+            return self._put_on_disk(batch_id, name, role, [data])
+
+        if self.write_through and (role == 'output' or persist):
+            artifact = self._put_on_disk(batch_id, name, role, [data])
+            with self._lock:
+                victims = self._keep_in_memory(batch_id, artifact, data) if self._is_stored(batch_id, artifact) else []
+        else:
+            with self._lock:
+                batch = self._batches[batch_id]
+                artifact = Artifact(self._unique_name(batch, name), role)
+                batch.artifacts[artifact.name] = artifact
+                victims = self._keep_in_memory(batch_id, artifact, data)
+
+        self._spill(victims)
+        return artifact
+
+    def put_stream(self, batch_id, name, stream, role='output', persist=False):
+        """Store a file-like or an iterator of byte chunks, buffering at most max_memory_file"""
+        chunks = iter(lambda: stream.read(STREAM_CHUNK_SIZE), b'') if hasattr(stream, 'read') else iter(stream)
+        buffered = []
+        size = 0
+        for chunk in chunks:
+            buffered.append(chunk)
+            size += len(chunk)
+            if size > self.max_memory_file:
+                ARTIFACT_SPILLS.labels('too_large').inc()
+                return self._put_on_disk(batch_id, name, role, buffered, chunks)
+        return self.put(batch_id, name, b''.join(buffered), role, persist)
+
+    def rename(self, batch_id, name, new_name):
+        with self._lock:
+            batch = self._batches[batch_id]
+            artifact = batch.artifacts.pop(name)
+            new_name = self._unique_name(batch, new_name)
+            if artifact.path is not None:
+                new_path = os.path.join(batch.folder, secure_filename(new_name))
+                os.rename(artifact.path, new_path)
+                artifact.path = new_path
+            if self._memory.pop((batch_id, name), None) is not None:
+                self._memory[(batch_id, new_name)] = artifact
+            artifact.name = new_name
+            batch.artifacts[new_name] = artifact
+            return artifact
+
+    def remove(self, batch_id, name):
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            artifact = batch.artifacts.pop(name, None) if batch is not None else None
+            if artifact is None:
+                return
+            self._forget(batch_id, artifact)
+        if artifact.path is not None and os.path.exists(artifact.path):
+            os.remove(artifact.path)
+
+    def discard_batch(self, batch_id):
+        with self._lock:
+            batch = self._batches.pop(batch_id, None)
+            if batch is None:
+                return
+            for artifact in batch.artifacts.values():
+                self._forget(batch_id, artifact)
+        shutil.rmtree(batch.folder, ignore_errors=True)
+
+    def expire(self):
+        """Drop batches older than the TTL. Returns how many were removed"""
+        self._last_expire = time.monotonic()
+        if not self.ttl:
+            return 0
+        cutoff = time.monotonic() - self.ttl
+        with self._lock:
+            expired = [batch_id for batch_id, batch in self._batches.items() if batch.created_at < cutoff]
+        for batch_id in expired:
+            self.discard_batch(batch_id)
+        return len(expired)
+
+    def stats(self):
+        """Byte usage per location, used as the artifact_store_bytes gauge callback"""
+        return {('memory',): self.memory_bytes, ('disk',): self.disk_bytes}
+
+    def _unique_name(self, batch, name):
+        if name not in batch.artifacts:
+            return name
+        stem, ext = os.path.splitext(name)
+        n = 1
+        while f'{stem}-{n}{ext}' in batch.artifacts:
+            n += 1
+        return f'{stem}-{n}{ext}'
+
+    def _is_stored(self, batch_id, artifact):
+        # Caller holds the lock; False when removed while it was being written
+        batch = self._batches.get(batch_id)
+        return batch is not None and batch.artifacts.get(artifact.name) is artifact
+
+    def _keep_in_memory(self, batch_id, artifact, data):
+        # Caller holds the lock; returns the artifacts _spill() has to write out
+        artifact.data = data
+        artifact.size = len(data)
+        self._memory[(batch_id, artifact.name)] = artifact
+        self.memory_bytes += artifact.size
+        return self._select_spills()
+
+    def _forget(self, batch_id, artifact):
+        # Caller holds the lock. Written-through artifacts count in both places;
+        # artifacts picked for spilling count on disk before their path is set
+        in_memory = self._memory.pop((batch_id, artifact.name), None) is not None
+        if in_memory:
+            self.memory_bytes -= artifact.size
+        if artifact.path is not None or not in_memory:
+            self.disk_bytes -= artifact.size
+
+    def _select_spills(self):
+        # Caller holds the lock; the bytes are written by _spill() after it is released
+        victims = []
+        while self.memory_bytes > self.memory_budget and self._memory:
+            (batch_id, _), artifact = self._memory.popitem(last=False)
+            self.memory_bytes -= artifact.size
+            if artifact.path is not None:
+                # Already written through: just drop the in-memory copy
+                artifact.data = None
+                continue
+            self.disk_bytes += artifact.size
+            victims.append((batch_id, artifact))
+        return victims
+
+    def _spill(self, victims):
+        for batch_id, artifact in victims:
+            folder = os.path.join(self.root, batch_id)
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, secure_filename(artifact.name))
+            with open(path, 'wb') as f:
+                f.write(artifact.data)
+            artifact.path = path
+            artifact.data = None
+            ARTIFACT_SPILLS.labels('budget').inc()
+
+    def _put_on_disk(self, batch_id, name, role, buffered, rest=()):
+        with self._lock:
+            batch = self._batches[batch_id]
+            name = self._unique_name(batch, name)
+            # Reserve the name before writing so concurrent puts cannot collide
+            artifact = Artifact(name, role, path=os.path.join(batch.folder, secure_filename(name)))
+            batch.artifacts[name] = artifact
+
+        os.makedirs(batch.folder, exist_ok=True)
+        size = 0
+        with open(artifact.path, 'wb') as f:
+            for chunk in buffered:
+                f.write(chunk)
+                size += len(chunk)
+            for chunk in rest:
+                f.write(chunk)
+                size += len(chunk)
+
+        with self._lock:
+            artifact.size = size
+            if self._is_stored(batch_id, artifact):
+                self.disk_bytes += size
+                return artifact
+        if os.path.exists(artifact.path):
+            os.remove(artifact.path)
+        return artifact
+
+
+def init_artifact_store(app):
+    """Attach an ArtifactStore rooted at UPLOAD_FOLDER to the app.
+
+    ARTIFACT_MEMORY_MB: global in-memory budget (0 keeps everything on disk).
+    ARTIFACT_MAX_MEMORY_FILE_MB: larger artifacts always go to disk.
+    ARTIFACT_WRITE_THROUGH: write outputs to disk as well (default on), so
+    downloads work with several gunicorn workers sharing UPLOAD_FOLDER. Turn it
+    off only when a single process serves every request.
+    ARTIFACT_TTL_SECONDS: how long batches remain downloadable.
+    """
+    app.config.setdefault('ARTIFACT_MEMORY_MB', float(os.getenv('ARTIFACT_MEMORY_MB', 64)))
+    app.config.setdefault('ARTIFACT_WRITE_THROUGH',
+                          os.getenv('ARTIFACT_WRITE_THROUGH', '1').lower() not in ('0', 'false', 'no'))
+    app.config.setdefault('ARTIFACT_MAX_MEMORY_FILE_MB', float(os.getenv('ARTIFACT_MAX_MEMORY_FILE_MB', 8)))
+    app.config.setdefault('ARTIFACT_TTL_SECONDS', int(os.getenv('ARTIFACT_TTL_SECONDS', 86400)))
+
+    store = ArtifactStore(
+        app.config['UPLOAD_FOLDER'],
+        memory_budget=int(app.config['ARTIFACT_MEMORY_MB'] * 1024 * 1024),
+        max_memory_file=int(app.config['ARTIFACT_MAX_MEMORY_FILE_MB'] * 1024 * 1024),
+        ttl=app.config['ARTIFACT_TTL_SECONDS'],
+        write_through=app.config['ARTIFACT_WRITE_THROUGH']
+    )
+    app.extensions['artifact_store'] = store
+    REGISTRY.gauge('artifact_store_bytes', 'Bytes held by the PDF artifact store.', ('location',)).callback = store.stats
+    return store
+
+
+def get_artifact_store():
+    return current_app.extensions['artifact_store']
+
+
+def send_artifact(batch_id, filename, logger):
+    """Serve a batch output from memory when possible, falling back to the batch folder"""
+    artifact = get_artifact_store().get(batch_id, filename)
+    if artifact is None:
+        # Batch created by another worker (or before a restart): only spilled files exist
+        batch_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], batch_id)
+        if not os.path.exists(batch_folder):
+            logger.error(f"Batch folder not found: {batch_folder}")
+            return jsonify({'error': 'File not found'}), 404
+        return send_from_directory(batch_folder, filename, as_attachment=True, mimetype='application/pdf')
+
+    data = artifact.data
+    return send_file(
+        io.BytesIO(data) if data is not None else artifact.path,
+        as_attachment=True,
+        download_name=artifact.name,
+        mimetype='application/pdf',
+        etag=f'{batch_id}-{artifact.name}-{artifact.size}',
+        last_modified=artifact.created_at
+    )
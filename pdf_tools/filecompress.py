@@ -1,10 +1,11 @@
 import os
-from flask import Flask, Blueprint, request, jsonify, send_from_directory, current_app
-from pylovepdf.ilovepdf import ILovePdf
+from flask import Flask, Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
 from datetime import datetime
+from middleware.metrics import count_bytes, stage_timer
+from pdf_tools.artifacts import get_artifact_store, send_artifact
+from pdf_tools.ilovepdf_runner import run_task, start_task
 import logging
-import uuid
 from flask_cors import CORS
 
 # Setup logging
@@ -41,14 +42,9 @@ def compress_pdf():
         if not files or files[0].filename == '':
             return jsonify({'error': 'No files selected'}), 400
 
-        # Setup upload folder
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        # Create batch folder
-        batch_id = str(uuid.uuid4())
-        batch_folder = os.path.join(upload_folder, batch_id)
-        os.makedirs(batch_folder, exist_ok=True)
+        # Create batch (kept in memory, spilled to UPLOAD_FOLDER/<batch_id> when large)
+        batch = get_artifact_store().create_batch()
+        batch_id = batch.id
         
         results = []
         total_original_size = 0
@@ -61,54 +57,43 @@ def compress_pdf():
 
             # Save original file
             original_filename = secure_filename(file.filename)
-            original_path = os.path.join(batch_folder, original_filename)
-            file.save(original_path)
-            logger.info(f"File saved: {original_path}")
+            with stage_timer('compress', 'save_upload'):
+                original = batch.save_upload(file, original_filename)
+            logger.info(f"File saved: {batch_id}/{original.name}")
 
             # Initialize iLovePDF with compression level
             public_key = current_app.config['ILOVEPDF_PUBLIC_KEY']
-            ilovepdf = ILovePdf(public_key, verify_ssl=True)
-            task = ilovepdf.new_task('compress')
+            task = start_task(public_key, 'compress', 'compress')
             
             # Set the validated compression level
             task.compression_level = compression_level
             
-            task.add_file(original_path)
-            task.set_output_folder(batch_folder)
-            task.execute()
-            task.download()
-
-            # Find compressed file
-            pdf_files = [f for f in os.listdir(batch_folder) 
-                        if f.endswith('.pdf') and f != original_filename]
-            pdf_files.sort(key=lambda x: os.path.getmtime(os.path.join(batch_folder, x)), 
-                         reverse=True)
-
-            if not pdf_files:
+            task.add_file(original.name)
+            outputs = run_task(task, batch, 'compress')
+
+            if not outputs:
                 logger.error(f"No compressed file found for {original_filename}")
                 continue
 
-            compressed_file = pdf_files[0]
-            compressed_path = os.path.join(batch_folder, compressed_file)
-
             # Rename compressed file
             name_wo_ext = os.path.splitext(original_filename)[0]
             today = datetime.now().strftime("%Y%m%d")
             new_filename = f"{name_wo_ext}_compressed_{frontend_level}_{today}.pdf"
-            new_path = os.path.join(batch_folder, new_filename)
-            os.rename(compressed_path, new_path)
+            compressed = batch.rename(outputs[0].name, new_filename)
 
             # Calculate stats
-            original_size = os.path.getsize(original_path)
-            compressed_size = os.path.getsize(new_path)
+            original_size = original.size
+            compressed_size = compressed.size
             reduction = ((original_size - compressed_size) / original_size) * 100
             
             total_original_size += original_size
             total_compressed_size += compressed_size
+            count_bytes('compress', 'input', original_size)
+            count_bytes('compress', 'output', compressed_size)
 
             results.append({
                 'original_filename': original_filename,
-                'compressed_filename': new_filename,
+                'compressed_filename': compressed.name,
                 'original_size': original_size,
                 'compressed_size': compressed_size,
                 'reduction': round(reduction, 2),
@@ -116,7 +101,7 @@ def compress_pdf():
             })
 
             # Remove original file
-            os.remove(original_path)
+            batch.remove(original.name)
             logger.info(f"Compression complete for {original_filename}")
 
         if not results:
@@ -144,19 +129,7 @@ def compress_pdf():
 @compress_bp.route('/download/<batch_id>/<filename>')
 def download_file(batch_id, filename):
     try:
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        batch_folder = os.path.join(upload_folder, batch_id)
-        
-        if not os.path.exists(batch_folder):
-            logger.error(f"Batch folder not found: {batch_folder}")
-            return jsonify({'error': 'File not found'}), 404
-            
-        return send_from_directory(
-            batch_folder,
-            filename,
-            as_attachment=True,
-            mimetype='application/pdf'
-        )
+        return send_artifact(batch_id, filename, logger)
         
     except Exception as e:
         logger.error(f"Download error: {str(e)}", exc_info=True)
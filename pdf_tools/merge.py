@@ -1,10 +1,10 @@
-import os
-from flask import Flask, Blueprint, request, jsonify, send_from_directory, current_app
-from pylovepdf.ilovepdf import ILovePdf
+from flask import Flask, Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
 from datetime import datetime
+from middleware.metrics import count_bytes, stage_timer
+from pdf_tools.artifacts import get_artifact_store, send_artifact
+from pdf_tools.ilovepdf_runner import run_task, start_task
 import logging
-import uuid
 from flask_cors import CORS
 
 # Setup logging
@@ -32,14 +32,9 @@ def merge_pdfs():
         if len(files) < 2:
             return jsonify({'error': 'At least 2 PDFs required for merging'}), 400
 
-        # Setup upload folder
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        # Create batch folder
-        batch_id = str(uuid.uuid4())
-        batch_folder = os.path.join(upload_folder, batch_id)
-        os.makedirs(batch_folder, exist_ok=True)
+        # Create batch (kept in memory, spilled to UPLOAD_FOLDER/<batch_id> when large)
+        batch = get_artifact_store().create_batch()
+        batch_id = batch.id
         
         # Save all uploaded files
         original_filenames = []
@@ -52,61 +47,48 @@ def merge_pdfs():
 
             # Save original file
             original_filename = secure_filename(file.filename)
-            original_path = os.path.join(batch_folder, original_filename)
-            file.save(original_path)
-            original_filenames.append(original_filename)
-            total_original_size += os.path.getsize(original_path)
-            logger.info(f"File saved: {original_path}")
+            with stage_timer('merge', 'save_upload'):
+                original = batch.save_upload(file, original_filename)
+            original_filenames.append(original.name)
+            total_original_size += original.size
+            logger.info(f"File saved: {batch_id}/{original.name}")
 
         if len(original_filenames) < 2:
             return jsonify({'error': 'Not enough valid PDFs for merging'}), 400
 
         # Initialize iLovePDF
         public_key = current_app.config['ILOVEPDF_PUBLIC_KEY']
-        ilovepdf = ILovePdf(public_key, verify_ssl=True)
-        task = ilovepdf.new_task('merge')
+        task = start_task(public_key, 'merge', 'merge')
         
         # Add all files to the merge task
         for filename in original_filenames:
-            file_path = os.path.join(batch_folder, filename)
-            task.add_file(file_path)
+            task.add_file(filename)
         
-        task.set_output_folder(batch_folder)
-        task.execute()
-        task.download()
-
-        # Find merged file (should be the newest PDF in the folder)
-        pdf_files = [f for f in os.listdir(batch_folder) if f.endswith('.pdf')]
-        pdf_files.sort(key=lambda x: os.path.getmtime(os.path.join(batch_folder, x)), 
-                     reverse=True)
+        outputs = run_task(task, batch, 'merge')
 
-        if not pdf_files:
+        if not outputs:
             logger.error("No merged file found")
             return jsonify({'error': 'Merge operation failed'}), 500
 
-        merged_file = pdf_files[0]
-        merged_path = os.path.join(batch_folder, merged_file)
-
         # Rename merged file
         today = datetime.now().strftime("%Y%m%d")
         new_filename = f"merged_{today}.pdf"
-        new_path = os.path.join(batch_folder, new_filename)
-        os.rename(merged_path, new_path)
+        merged = batch.rename(outputs[0].name, new_filename)
 
         # Calculate stats
-        merged_size = os.path.getsize(new_path)
+        merged_size = merged.size
+        count_bytes('merge', 'input', total_original_size)
+        count_bytes('merge', 'output', merged_size)
         reduction = ((total_original_size - merged_size) / total_original_size) * 100 if total_original_size > 0 else 0
 
         # Clean up original files
         for filename in original_filenames:
-            file_path = os.path.join(batch_folder, filename)
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            batch.remove(filename)
 
         return jsonify({
             'success': True,
             'batch_id': batch_id,
-            'merged_filename': new_filename,
+            'merged_filename': merged.name,
             'merged_size': merged_size,
             'total_original_size': total_original_size,
             'size_reduction': round(reduction, 2),
@@ -123,19 +105,7 @@ def merge_pdfs():
 @merge_bp.route('/download/<batch_id>/<filename>')
 def download_file(batch_id, filename):
     try:
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        batch_folder = os.path.join(upload_folder, batch_id)
-        
-        if not os.path.exists(batch_folder):
-            logger.error(f"Batch folder not found: {batch_folder}")
-            return jsonify({'error': 'File not found'}), 404
-            
-        return send_from_directory(
-            batch_folder,
-            filename,
-            as_attachment=True,
-            mimetype='application/pdf'
-        )
+        return send_artifact(batch_id, filename, logger)
         
     except Exception as e:
         logger.error(f"Download error: {str(e)}", exc_info=True)
@@ -0,0 +1,36 @@
+"""Page rendering run inside the thumbnail process pool.
+
+Kept free of Flask and app imports so spawned workers start quickly.
+"""
+
+
+def open_document(source):
+    """Open a PDF given as bytes or as a path"""
+    # Imported here: PyMuPDF is optional and only needed by pool workers
+    import pymupdf
+
+    if isinstance(source, bytes):
+        return pymupdf.open(stream=source, filetype='pdf')
+    return pymupdf.open(source, filetype='pdf')
+
+
+def count_pages(source):
+    with open_document(source) as document:
+        return document.page_count
+
+
+def render_page(source, page_number, width, quality=75):
+    """Render one 1-based page as a JPEG `width` pixels wide.
+
+    Returns (jpeg_bytes, page_count); jpeg_bytes is None when the page does not exist.
+    """
+    import pymupdf
+
+    with open_document(source) as document:
+        page_count = document.page_count
+        if not 1 <= page_number <= page_count:
+            return None, page_count
+        page = document[page_number - 1]
+        zoom = width / page.rect.width
+        pixmap = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+        return pixmap.tobytes('jpeg', jpg_quality=quality), page_count
@@ -1,10 +1,11 @@
 import os
 import logging
-import uuid
-from flask import Flask, Blueprint, request, jsonify, send_from_directory, current_app
-from pylovepdf.ilovepdf import ILovePdf
+from flask import Flask, Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
 from datetime import datetime
+from middleware.metrics import count_bytes, stage_timer
+from pdf_tools.artifacts import get_artifact_store, send_artifact
+from pdf_tools.ilovepdf_runner import run_task, start_task
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -43,25 +44,19 @@ def split_pdf():
         except ValueError as e:
             return jsonify({'error': f'Invalid interval: {str(e)}'}), 400
 
-        # Setup upload folder
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        # Create batch folder
-        batch_id = str(uuid.uuid4())
-        batch_folder = os.path.join(upload_folder, batch_id)
-        os.makedirs(batch_folder, exist_ok=True)
+        # Create batch (kept in memory, spilled to UPLOAD_FOLDER/<batch_id> when large)
+        batch = get_artifact_store().create_batch()
+        batch_id = batch.id
 
         # Save original file
         original_filename = secure_filename(file.filename)
-        original_path = os.path.join(batch_folder, original_filename)
-        file.save(original_path)
-        logger.info(f"File saved: {original_path}")
+        with stage_timer('split', 'save_upload'):
+            original = batch.save_upload(file, original_filename)
+        logger.info(f"File saved: {batch_id}/{original.name}")
 
         # Initialize iLovePDF
         public_key = current_app.config['ILOVEPDF_PUBLIC_KEY']
-        ilovepdf = ILovePdf(public_key, verify_ssl=True)
-        task = ilovepdf.new_task('split')
+        task = start_task(public_key, 'split', 'split')
         
         # Configure split based on mode
         if split_mode == 'ranges':
@@ -72,15 +67,8 @@ def split_pdf():
             task.split_mode = 'interval'
             task.fixed_range = interval
 
-        task.add_file(original_path)
-        task.set_output_folder(batch_folder)
-        task.execute()
-        task.download()
-
-        # Find split files
-        split_files = [f for f in os.listdir(batch_folder) 
-                     if f.endswith('.pdf') and f != original_filename]
-        split_files.sort()
+        task.add_file(original.name)
+        split_files = run_task(task, batch, 'split')
 
         if not split_files:
             logger.error("No split files found")
@@ -88,23 +76,21 @@ def split_pdf():
 
         # Prepare response data
         results = []
-        for i, filename in enumerate(split_files):
-            file_path = os.path.join(batch_folder, filename)
-            size = os.path.getsize(file_path)
+        for i, split_file in enumerate(split_files):
+            count_bytes('split', 'output', split_file.size)
             
             # Rename file to be more descriptive
             new_filename = f"{os.path.splitext(original_filename)[0]}_part_{i+1}.pdf"
-            new_path = os.path.join(batch_folder, new_filename)
-            os.rename(file_path, new_path)
+            part = batch.rename(split_file.name, new_filename)
             
             results.append({
-                'filename': new_filename,
-                'size': size,
-                'download_url': f"{request.host_url}api/pdf-tools/download/{batch_id}/{new_filename}"
+                'filename': part.name,
+                'size': part.size,
+                'download_url': f"{request.host_url}api/pdf-tools/download/{batch_id}/{part.name}"
             })
 
         # Remove original file
-        os.remove(original_path)
+        batch.remove(original.name)
 
         return jsonify({
             'success': True,
@@ -128,19 +114,7 @@ def split_pdf():
 @split_bp.route('/download/<batch_id>/<filename>')
 def download_file(batch_id, filename):
     try:
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        batch_folder = os.path.join(upload_folder, batch_id)
-        
-        if not os.path.exists(batch_folder):
-            logger.error(f"Batch folder not found: {batch_folder}")
-            return jsonify({'error': 'File not found'}), 404
-            
-        return send_from_directory(
-            batch_folder,
-            filename,
-            as_attachment=True,
-            mimetype='application/pdf'
-        )
+        return send_artifact(batch_id, filename, logger)
         
     except Exception as e:
         logger.error(f"Download error: {str(e)}", exc_info=True)
@@ -0,0 +1,268 @@
+import os
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from flask import Blueprint, Response, request, jsonify, current_app
+from werkzeug.utils import secure_filename
+from middleware.metrics import REGISTRY, count_bytes, stage_timer
+from pdf_tools.artifacts import file_digest, get_artifact_store
+from pdf_tools.pagerender import count_pages, render_page
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Initialize Flask Blueprint
+thumbnail_bp = Blueprint('thumbnail', __name__, url_prefix='/api/pdf-tools')
+
+# Requested widths are rounded up to one of these so the cache is shared between clients
+THUMBNAIL_WIDTHS = (100, 200, 400)
+
+THUMBNAIL_REQUESTS = REGISTRY.counter(
+    'thumbnail_requests_total', 'Thumbnail lookups by result (hit, miss, joined).', ('result',))
+
+# Content hashes of files found on disk, keyed by (path, mtime, size), so cache
+# hits do not re-read the whole PDF
+DISK_DIGESTS_MAX = 1024
+disk_digests = OrderedDict()
+disk_digests_lock = threading.Lock()
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.lower().endswith('.pdf')
+
+
+def thumbnail_width(requested):
+    for width in THUMBNAIL_WIDTHS:
+        if requested <= width:
+            return width
+    return THUMBNAIL_WIDTHS[-1]
+
+
+class ThumbnailCache:
+    """LRU of rendered thumbnails keyed by (content hash, page, width), bounded in bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None:
+                self._items.move_to_end(key)
+            return entry
+
+    def put(self, key, image, page_count):
+        if len(image) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old[0])
+            self._items[key] = (image, page_count)
+            self.size += len(image)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class ThumbnailRenderer:
+    """Renders pages in a process pool, sharing in-flight renders of the same key.
+
+    The pool is started on the first render so cold starts that never request
+    a thumbnail do not pay for it.
+    """
+
+    def __init__(self, workers, cache_bytes, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self.cache = ThumbnailCache(cache_bytes)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: forking a threaded web worker can deadlock the child
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _submit(self, func, *args):
+        try:
+            return self._get_pool().submit(func, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory on a hostile PDF); start a fresh pool
+            with self._pool_lock:
+                self._pool = None
+            return self._get_pool().submit(func, *args)
+
+    def page_count(self, source):
+        return self._submit(count_pages, source).result(timeout=self.timeout)
+
+    def render(self, digest, source, page, width):
+        """Return (jpeg_bytes or None, page_count) for one page"""
+        key = (digest, page, width)
+        entry = self.cache.get(key)
+        if entry is not None:
+            THUMBNAIL_REQUESTS.labels('hit').inc()
+            return entry
+
+        with self._lock:
+            future = self._pending.get(key)
+            joined = future is not None
+            if not joined:
+                future = self._pending[key] = self._submit(render_page, source, page, width)
+        if joined:
+            THUMBNAIL_REQUESTS.labels('joined').inc()
+        else:
+            THUMBNAIL_REQUESTS.labels('miss').inc()
+            future.add_done_callback(lambda _: self._forget(key))
+
+        with stage_timer('thumbnail', 'render'):
+            image, page_count = future.result(timeout=self.timeout)
+        if image is not None:
+            self.cache.put(key, image, page_count)
+        return image, page_count
+
+    def _forget(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+
+
+def init_thumbnails(app):
+    """Attach a ThumbnailRenderer to the app.
+
+    THUMBNAIL_WORKERS: render processes (default: CPU count, at most 4).
+    THUMBNAIL_CACHE_MB: byte budget of the rendered-thumbnail LRU.
+    THUMBNAIL_TIMEOUT: seconds to wait for one render.
+    """
+    app.config.setdefault('THUMBNAIL_WORKERS', int(os.getenv('THUMBNAIL_WORKERS', min(4, os.cpu_count() or 1))))
+    app.config.setdefault('THUMBNAIL_CACHE_MB', float(os.getenv('THUMBNAIL_CACHE_MB', 32)))
+    app.config.setdefault('THUMBNAIL_TIMEOUT', float(os.getenv('THUMBNAIL_TIMEOUT', 30)))
+
+    renderer = ThumbnailRenderer(
+        app.config['THUMBNAIL_WORKERS'],
+        int(app.config['THUMBNAIL_CACHE_MB'] * 1024 * 1024),
+        app.config['THUMBNAIL_TIMEOUT']
+    )
+    app.extensions['thumbnail_renderer'] = renderer
+    return renderer
+
+
+def find_pdf(batch_id, filename):
+    """(content hash, bytes or path) of a batch file, or None if it does not exist"""
+    artifact = get_artifact_store().get(batch_id, filename)
+    if artifact is not None:
+        data = artifact.data
+        return artifact.digest(), data if data is not None else artifact.path
+
+    # Batch created by another worker: only spilled and written-through files exist on disk
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], secure_filename(batch_id), secure_filename(filename))
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with disk_digests_lock:
+        digest = disk_digests.get(key)
+        if digest is not None:
+            disk_digests.move_to_end(key)
+            return digest, path
+
+    digest = file_digest(open(path, 'rb'))
+    with disk_digests_lock:
+        disk_digests[key] = digest
+        while len(disk_digests) > DISK_DIGESTS_MAX:
+            disk_digests.popitem(last=False)
+    return digest, path
+
+
+@thumbnail_bp.route('/preview', methods=['POST'])
+def upload_preview():
+    """Upload a PDF only to preview it, before choosing pages for split or watermark"""
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file uploaded'}), 400
+
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+
+        if not allowed_file(file.filename):
+            return jsonify({'error': 'Invalid file type. Only PDFs are allowed'}), 400
+
+        batch = get_artifact_store().create_batch()
+        with stage_timer('thumbnail', 'save_upload'):
+            # Persisted: thumbnail requests may land on another worker
+            artifact = batch.save_upload(file, secure_filename(file.filename), persist=True)
+        count_bytes('thumbnail', 'input', artifact.size)
+
+        data = artifact.data
+        renderer = current_app.extensions['thumbnail_renderer']
+        with stage_timer('thumbnail', 'count_pages'):
+            page_count = renderer.page_count(data if data is not None else artifact.path)
+
+        return jsonify({
+            'success': True,
+            'batch_id': batch.id,
+            'filename': artifact.name,
+            'page_count': page_count,
+            'thumbnail_url': f"{request.host_url}api/pdf-tools/thumbnail/{batch.id}/{artifact.name}/{{page}}"
+        })
+
+    except ImportError:
+        return jsonify({'error': 'Thumbnail rendering is not available (PyMuPDF is not installed)'}), 501
+    except FutureTimeoutError:
+        logger.error("Page count timed out for preview upload")
+        return jsonify({'error': 'Reading the PDF timed out'}), 504
+    except Exception as e:
+        logger.error(f"PDF preview error: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Failed to read PDF',
+            'details': str(e)
+        }), 500
+
+
+@thumbnail_bp.route('/thumbnail/<batch_id>/<filename>/<int:page>')
+def get_thumbnail(batch_id, filename, page):
+    """JPEG preview of one page (1-based); ?width= is rounded up to 100, 200 or 400 px"""
+    try:
+        width = thumbnail_width(request.args.get('width', 200, type=int))
+
+        found = find_pdf(batch_id, filename)
+        if found is None:
+            return jsonify({'error': 'File not found'}), 404
+        digest, source = found
+
+        renderer = current_app.extensions['thumbnail_renderer']
+        image, page_count = renderer.render(digest, source, page, width)
+        if image is None:
+            return jsonify({'error': f'Page {page} out of range', 'page_count': page_count}), 404
+
+        response = Response(image, mimetype='image/jpeg')
+        response.headers['X-Page-Count'] = str(page_count)
+        # Content-addressed: the same file, page and width always renders the same image
+        response.set_etag(f'{digest[:32]}-{page}-{width}')
+        response.cache_control.private = True
+        response.cache_control.max_age = 86400
+        return response.make_conditional(request)
+
+    except ImportError:
+        return jsonify({'error': 'Thumbnail rendering is not available (PyMuPDF is not installed)'}), 501
+    except FutureTimeoutError:
+        logger.error(f"Thumbnail render timed out: {batch_id}/{filename} page {page}")
+        return jsonify({'error': 'Thumbnail rendering timed out'}), 504
+    except Exception as e:
+        logger.error(f"Thumbnail error: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Failed to render thumbnail',
+            'details': str(e)
+        }), 500
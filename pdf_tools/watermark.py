@@ -1,11 +1,11 @@
 import os
 import logging
-import uuid
-from flask import Flask, Blueprint, request, jsonify, send_from_directory, current_app
-from pylovepdf.ilovepdf import ILovePdf
+from flask import Flask, Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
 from datetime import datetime
-from PIL import Image
+from middleware.metrics import count_bytes, stage_timer
+from pdf_tools.artifacts import get_artifact_store
+from pdf_tools.ilovepdf_runner import run_task, start_task
 import io
 
 # Setup logging
@@ -20,17 +20,20 @@ def allowed_file(filename, extensions=None):
         extensions = {'pdf'}
     return '.' in filename and filename.lower().split('.')[-1] in extensions
 
-def convert_to_pdf(image_file, output_path):
-    """Convert image file to PDF for watermarking"""
+def convert_to_pdf(image_file):
+    """Convert image file to PDF bytes for watermarking, or None on failure"""
+    from PIL import Image
+
     try:
         image = Image.open(io.BytesIO(image_file.read()))
         if image.mode != 'RGB':
             image = image.convert('RGB')
-        image.save(output_path, "PDF", resolution=100.0)
-        return True
+        output = io.BytesIO()
+        image.save(output, "PDF", resolution=100.0)
+        return output.getvalue()
     except Exception as e:
         logger.error(f"Image conversion error: {str(e)}")
-        return False
+        return None
 
 @watermark_bp.route('/watermark', methods=['POST'])
 def add_watermark():
@@ -53,33 +56,28 @@ def add_watermark():
         if not watermark_file and not watermark_text:
             return jsonify({'error': 'Either watermark file or text is required'}), 400
 
-        # Setup upload folder
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        # Create batch folder
-        batch_id = str(uuid.uuid4())
-        batch_folder = os.path.join(upload_folder, batch_id)
-        os.makedirs(batch_folder, exist_ok=True)
+        # Create batch (kept in memory, spilled to UPLOAD_FOLDER/<batch_id> when large)
+        batch = get_artifact_store().create_batch()
+        batch_id = batch.id
 
         # Save original PDF
         original_pdf_name = secure_filename(pdf_file.filename)
-        original_pdf_path = os.path.join(batch_folder, original_pdf_name)
-        pdf_file.save(original_pdf_path)
+        with stage_timer('watermark', 'save_upload'):
+            original_pdf = batch.save_upload(pdf_file, original_pdf_name)
 
-        watermark_path = None
+        watermark = None
         if watermark_file:
             # Handle both PDF and image watermarks
             if allowed_file(watermark_file.filename, {'pdf'}):
                 watermark_name = secure_filename(watermark_file.filename)
-                watermark_path = os.path.join(batch_folder, watermark_name)
-                watermark_file.save(watermark_path)
+                watermark = batch.save_upload(watermark_file, watermark_name)
             elif allowed_file(watermark_file.filename, {'png', 'jpg', 'jpeg'}):
                 # Convert image to PDF first
                 watermark_name = secure_filename(watermark_file.filename.split('.')[0] + '.pdf')
-                watermark_path = os.path.join(batch_folder, watermark_name)
-                if not convert_to_pdf(watermark_file, watermark_path):
+                watermark_pdf = convert_to_pdf(watermark_file)
+                if watermark_pdf is None:
                     return jsonify({'error': 'Failed to process image watermark'}), 400
+                watermark = batch.put(watermark_name, watermark_pdf, role='input')
             else:
                 return jsonify({'error': 'Watermark must be PDF or image (PNG/JPG)'}), 400
 
@@ -98,12 +96,11 @@ def add_watermark():
 
         # Initialize iLovePDF
         public_key = current_app.config['ILOVEPDF_PUBLIC_KEY']
-        ilovepdf = ILovePdf(public_key, verify_ssl=True)
-        task = ilovepdf.new_task('watermark')
+        task = start_task(public_key, 'watermark', 'watermark')
         
         # Configure watermark
-        if watermark_path:
-            task.file = watermark_path
+        if watermark:
+            task.file = watermark.name
             task.mode = 'image'
         else:
             task.text = watermark_text
@@ -122,51 +119,42 @@ def add_watermark():
         task.rotation = rotation
         task.pages = pages
 
-        task.add_file(original_pdf_path)
-        task.set_output_folder(batch_folder)
-        task.execute()
-        task.download()
-
-        # Find watermarked file
-        watermarked_files = [f for f in os.listdir(batch_folder) 
-                          if f.endswith('.pdf') and f != original_pdf_name and (not watermark_path or f != os.path.basename(watermark_path))]
+        task.add_file(original_pdf.name)
+        watermarked_files = run_task(task, batch, 'watermark')
         
         if not watermarked_files:
             logger.error("No watermarked file found")
             return jsonify({'error': 'Watermark operation failed'}), 500
 
-        # Prepare response
-        watermarked_file = watermarked_files[0]
-        watermarked_path = os.path.join(batch_folder, watermarked_file)
-        
         # Rename file
         name_wo_ext = os.path.splitext(original_pdf_name)[0]
         new_filename = f"{name_wo_ext}_watermarked.pdf"
-        new_path = os.path.join(batch_folder, new_filename)
-        os.rename(watermarked_path, new_path)
+        watermarked = batch.rename(watermarked_files[0].name, new_filename)
 
-        original_size = os.path.getsize(original_pdf_path)
-        watermarked_size = os.path.getsize(new_path)
+        original_size = original_pdf.size
+        watermarked_size = watermarked.size
+        count_bytes('watermark', 'input', original_size)
+        count_bytes('watermark', 'output', watermarked_size)
 
         # Clean up
-        os.remove(original_pdf_path)
-        if watermark_path and os.path.exists(watermark_path):
-            os.remove(watermark_path)
+        batch.remove(original_pdf.name)
+        if watermark:
+            batch.remove(watermark.name)
 
         return jsonify({
             'success': True,
             'batch_id': batch_id,
-            'watermarked_filename': new_filename,
+            'watermarked_filename': watermarked.name,
             'original_size': original_size,
             'watermarked_size': watermarked_size,
-            'download_url': f"{request.host_url}api/pdf-tools/download/{batch_id}/{new_filename}",
+            'download_url': f"{request.host_url}api/pdf-tools/download/{batch_id}/{watermarked.name}",
             'parameters': {
-                'type': 'image' if watermark_path else 'text',
+                'type': 'image' if watermark else 'text',
                 'position': position,
                 'opacity': opacity,
                 'pages': pages,
                 'rotation': rotation,
-                'font_style': font_style if not watermark_path else None
+                'font_style': font_style if not watermark else None
             }
         })
 
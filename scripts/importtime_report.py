@@ -0,0 +1,136 @@
+"""Cold-start import cost per blueprint, measured with `python -X importtime`.
+
+Each blueprint module is imported in a fresh interpreter on top of the
+baseline every request already pays (Flask, flask-cors, dotenv). The heavy
+SDKs that are now imported on the first request that needs them are measured
+separately, so the report shows what a cold invocation pays at import time
+and what the first matching request pays later.
+
+Usage:
+    python scripts/importtime_report.py
+    python scripts/importtime_report.py --repeat 5 --json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BASELINE = ['flask', 'flask_cors', 'dotenv']
+
+BLUEPRINTS = {
+    'documentasi': 'documentasi.public',
+    'compress': 'pdf_tools.filecompress',
+    'merge': 'pdf_tools.merge',
+    'split': 'pdf_tools.split',
+    'watermark': 'pdf_tools.watermark',
+    'thumbnail': 'pdf_tools.thumbnail',
+    'project': 'otherTools.aiagentCode',
+}
+
+# Modules each blueprint imports lazily on its first request
+DEFERRED = {
+    'documentasi': [],
+    'compress': ['pylovepdf.ilovepdf'],
+    'merge': ['pylovepdf.ilovepdf'],
+    'split': ['pylovepdf.ilovepdf'],
+    'watermark': ['pylovepdf.ilovepdf', 'PIL.Image'],
+    'thumbnail': ['pymupdf'],
+    'project': ['google.generativeai', 'bs4'],
+}
+
+
+def run_importtime(modules):
+    """Import `modules` in a fresh interpreter and return the parsed importtime rows."""
+    statement = '; '.join(f'import {name}' for name in modules) or 'pass'
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Import failed for {modules}: {result.stderr.strip().splitlines()[-1]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append({
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+            'name': name.rstrip(),
+        })
+    return rows
+
+
+def measure(modules, baseline, repeat):
+    """Marginal import cost of `modules` over `baseline`, best of `repeat` runs."""
+    best = None
+    for _ in range(repeat):
+        base_rows = run_importtime(baseline)
+        rows = run_importtime(baseline + modules)
+        loaded_by_baseline = {row['name'].strip() for row in base_rows}
+        extra = [row for row in rows if row['name'].strip() not in loaded_by_baseline]
+        total_us = sum(row['self_us'] for row in extra)
+        if best is None or total_us < best[0]:
+            best = (total_us, extra)
+
+    total_us, extra = best
+    # Direct imports of the measured modules (one indent level), heaviest first
+    children = [row for row in extra
+                if row['name'].startswith('  ') and not row['name'].startswith('    ')]
+    children.sort(key=lambda row: row['cumulative_us'], reverse=True)
+    return {
+        'import_ms': round(total_us / 1000, 2),
+        'modules_loaded': len(extra),
+        'heaviest': [
+            {'name': row['name'].strip(), 'cumulative_ms': round(row['cumulative_us'] / 1000, 2)}
+            for row in children[:5]
+        ],
+    }
+
+
+def build_report(repeat):
+    report = {'python': sys.version.split()[0], 'baseline': BASELINE, 'blueprints': {}}
+    for name, module in BLUEPRINTS.items():
+        cold = measure([module], BASELINE, repeat)
+        deferred = DEFERRED[name]
+        first_request = measure(deferred, BASELINE + [module], repeat) if deferred else None
+        report['blueprints'][name] = {
+            'module': module,
+            'cold_start': cold,
+            'deferred_modules': deferred,
+            'first_request': first_request,
+        }
+    report['app'] = measure(['app'], BASELINE, repeat)
+    return report
+
+
+def print_table(report):
+    print(f"Python {report['python']}, baseline: {', '.join(report['baseline'])}")
+    print(f"{'blueprint':<12} {'cold import ms':>15} {'first request ms':>17}  heaviest cold imports")
+    for name, entry in report['blueprints'].items():
+        first = entry['first_request']['import_ms'] if entry['first_request'] else 0.0
+        heaviest = ', '.join(f"{row['name']} ({row['cumulative_ms']})"
+                             for row in entry['cold_start']['heaviest'][:3])
+        print(f"{name:<12} {entry['cold_start']['import_ms']:>15.2f} {first:>17.2f}  {heaviest}")
+    print(f"{'app total':<12} {report['app']['import_ms']:>15.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement, best is kept')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args()
+
+    report = build_report(args.repeat)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_table(report)
+
+
+if __name__ == '__main__':
+    main()